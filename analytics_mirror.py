@@ -0,0 +1,249 @@
+import os
+import json
+import shutil
+import threading
+from collections import defaultdict
+from datetime import datetime
+import pandas as pd
+from config import ANALYTICS_MIRROR_ENABLED, PARQUET_DIR, ANALYTICS_MIN_DAYS, MIRROR_ROW_TOLERANCE
+from database_operations import get_db_connection
+
+# DuckDB e pyarrow são opcionais: sem eles o espelho fica desativado
+# e todas as leituras continuam no PostgreSQL
+try:
+    import duckdb
+    import pyarrow  # noqa: F401  (motor usado por DataFrame.to_parquet)
+except ImportError:
+    duckdb = None
+
+# Tabelas espelhadas (as séries de origem; submarket_wide fica só no PostgreSQL)
+MIRROR_TABLES = ['pld_submarket', 'cmo_submarket', 'ear_submarket', 'ena_submarket', 'energy_balance']
+
+# Marca d'água por tabela: {'complete': bool, 'rows': int, 'updated_at': str}
+STATE_PATH = os.path.join(PARQUET_DIR, '_state.json')
+
+_state_lock = threading.Lock()
+# Uma trava por tabela: a exportação inicial e as gravações incrementais
+# da mesma tabela não se intercalam dentro do processo
+_table_locks = defaultdict(threading.Lock)
+
+def mirror_enabled():
+    """Indica se o espelho colunar pode ser usado"""
+    return ANALYTICS_MIRROR_ENABLED and duckdb is not None
+
+def is_long_range(start, end):
+    """Indica se o período pedido ('YYYY-MM-DD') é longo o bastante para ir ao espelho"""
+    if not start or not end:
+        return True
+    try:
+        days = (datetime.strptime(end[:10], '%Y-%m-%d') - datetime.strptime(start[:10], '%Y-%m-%d')).days
+    except ValueError:
+        return False
+    return days > ANALYTICS_MIN_DAYS
+
+def _table_dir(table_name):
+    return os.path.join(PARQUET_DIR, table_name)
+
+def _read_state():
+    if not os.path.exists(STATE_PATH):
+        return {}
+    with open(STATE_PATH) as f:
+        return json.load(f)
+
+def _update_state(table_name, **fields):
+    with _state_lock:
+        state = _read_state()
+        state.setdefault(table_name, {'complete': False, 'rows': 0})
+        state[table_name].update(fields, updated_at=datetime.now().isoformat())
+        os.makedirs(PARQUET_DIR, exist_ok=True)
+        tmp_path = STATE_PATH + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(state, f)
+        os.replace(tmp_path, STATE_PATH)
+
+def _pg_row_estimate(table_name):
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute("SELECT reltuples::BIGINT FROM pg_class WHERE oid = to_regclass(%s)", (table_name,))
+    row = cursor.fetchone()
+    conn.close()
+    return row[0] if row else None
+
+def is_complete(table_name):
+    """Indica se a tabela pode ser servida pelo espelho.
+
+    Exige a marca de completa gravada por bootstrap_mirror e uma contagem de
+    linhas compatível com a estimativa do PostgreSQL (pg_class.reltuples),
+    o que cobre cargas feitas por outro processo sem passar pelo espelho.
+    """
+    if not mirror_enabled():
+        return False
+
+    table_state = _read_state().get(table_name)
+    if not table_state or not table_state.get('complete'):
+        return False
+
+    try:
+        estimate = _pg_row_estimate(table_name)
+    except Exception as e:
+        print(f"Erro ao conferir espelho de {table_name}: {e}")
+        return False
+    # reltuples é -1 (ou 0) enquanto a tabela não foi analisada
+    if estimate and estimate > 0:
+        return table_state['rows'] >= estimate * (1 - MIRROR_ROW_TOLERANCE)
+    return True
+
+def bootstrap_mirror(table_name):
+    """Exporta a tabela inteira do PostgreSQL para o espelho e a marca como completa"""
+    if not mirror_enabled():
+        print("Espelho colunar indisponível (duckdb/pyarrow ausentes ou desativado)")
+        return
+
+    with _table_locks[table_name]:
+        _update_state(table_name, complete=False, rows=0)
+        try:
+            shutil.rmtree(_table_dir(table_name), ignore_errors=True)
+
+            conn = get_db_connection()
+            cursor = conn.cursor()
+            cursor.execute(f"SELECT DISTINCT EXTRACT(YEAR FROM date)::INT FROM {table_name} ORDER BY 1")
+            years = [row[0] for row in cursor.fetchall() if row[0] is not None]
+
+            rows = 0
+            for year in years:
+                df = pd.read_sql(
+                    f"SELECT * FROM {table_name} WHERE date >= %s AND date < %s",
+                    conn, params=[datetime(year, 1, 1), datetime(year + 1, 1, 1)]
+                )
+                part_dir = os.path.join(_table_dir(table_name), f"year={year}")
+                os.makedirs(part_dir, exist_ok=True)
+                df.sort_values(['id_subsistema', 'date']).to_parquet(
+                    os.path.join(part_dir, 'data.parquet'), index=False)
+                rows += len(df)
+            conn.close()
+
+            _update_state(table_name, complete=True, rows=rows)
+            print(f"Espelho de {table_name} exportado: {rows} linhas em {len(years)} anos")
+        except Exception as e:
+            print(f"Erro ao exportar {table_name} para o espelho: {e}")
+
+def bootstrap_all():
+    for table_name in MIRROR_TABLES:
+        bootstrap_mirror(table_name)
+
+def write_parquet_mirror(df, table_name):
+    """Acrescenta ao espelho as linhas gravadas no PostgreSQL.
+
+    Recebe o DataFrame devolvido por safe_insert, isto é, apenas linhas que
+    o banco aceitou, com os valores finais. Cada partição year=AAAA é
+    regravada mesclando o conteúdo existente (a versão nova prevalece na
+    chave (id_subsistema, date)). Tabelas ainda não exportadas por
+    bootstrap_mirror são ignoradas; qualquer falha desmarca a tabela como
+    completa, devolvendo as leituras ao PostgreSQL.
+    """
+    if df.empty or not mirror_enabled() or table_name not in MIRROR_TABLES:
+        return
+
+    with _table_locks[table_name]:
+        table_state = _read_state().get(table_name)
+        if not table_state or not table_state.get('complete'):
+            return
+
+        try:
+            df = df.copy()
+            df.columns = [col.lower() for col in df.columns]
+            df['date'] = pd.to_datetime(df['date'])
+            added = 0
+
+            for year, part in df.groupby(df['date'].dt.year):
+                part_dir = os.path.join(_table_dir(table_name), f"year={year}")
+                os.makedirs(part_dir, exist_ok=True)
+                path = os.path.join(part_dir, 'data.parquet')
+
+                existing = 0
+                if os.path.exists(path):
+                    current = pd.read_parquet(path)
+                    existing = len(current)
+                    part = pd.concat([current, part], ignore_index=True)
+
+                part = (part.drop_duplicates(subset=['id_subsistema', 'date'], keep='last')
+                            .sort_values(['id_subsistema', 'date']))
+                added += len(part) - existing
+
+                # Grava em arquivo temporário e troca atomicamente
+                tmp_path = path + '.tmp'
+                part.to_parquet(tmp_path, index=False)
+                os.replace(tmp_path, path)
+
+            _update_state(table_name, rows=table_state['rows'] + added)
+            print(f"Espelho Parquet atualizado para {table_name}")
+        except Exception as e:
+            _update_state(table_name, complete=False)
+            print(f"Erro ao gravar espelho Parquet de {table_name}: {e}")
+
+def _connect(table_name):
+    conn = duckdb.connect()
+    pattern = os.path.join(_table_dir(table_name), '*', '*.parquet').replace("'", "''")
+    conn.execute(
+        f"CREATE VIEW {table_name} AS "
+        f"SELECT * EXCLUDE (year) FROM read_parquet('{pattern}', hive_partitioning = true)"
+    )
+    return conn
+
+def read_table(table_name, columns=None, start_date=None, end_date=None, submarkets=None):
+    """Lê uma tabela do espelho via DuckDB.
+
+    Retorna None quando o espelho não está completo para a tabela ou a
+    consulta falha, para que o chamador volte ao PostgreSQL.
+    """
+    if table_name not in MIRROR_TABLES or not is_complete(table_name):
+        return None
+
+    try:
+        conn = _connect(table_name)
+        select = ', '.join(columns) if columns else '*'
+        query = f"SELECT {select} FROM {table_name}"
+        conditions = []
+        params = []
+
+        if start_date:
+            conditions.append("date >= CAST(? AS TIMESTAMP)")
+            params.append(start_date)
+        if end_date:
+            conditions.append("date <= CAST(? AS TIMESTAMP)")
+            params.append(end_date)
+        if submarkets:
+            placeholders = ",".join(["?"] * len(submarkets))
+            conditions.append(f"submarket IN ({placeholders})")
+            params.extend(submarkets)
+
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+
+        query += " ORDER BY date"
+
+        df = conn.execute(query, params).df()
+        conn.close()
+        return df
+    except Exception as e:
+        print(f"Erro ao consultar espelho de {table_name}: {e}")
+        return None
+
+def table_stats(table_name):
+    """Retorna (quantidade de registros, última data) lidos do espelho, ou None"""
+    if table_name not in MIRROR_TABLES or not is_complete(table_name):
+        return None
+
+    try:
+        conn = _connect(table_name)
+        count, last_date = conn.execute(f"SELECT COUNT(*), MAX(date) FROM {table_name}").fetchone()
+        conn.close()
+        return count, last_date
+    except Exception as e:
+        print(f"Erro ao consultar espelho de {table_name}: {e}")
+        return None
+
+# Exporta todas as tabelas do PostgreSQL para o espelho
+if __name__ == "__main__":
+    print("Exportando tabelas para o espelho colunar...")
+    bootstrap_all()
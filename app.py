@@ -5,9 +5,14 @@ import csv
 from datetime import datetime
 from threading import Thread
 from sqlalchemy import text
+from psycopg2 import sql
 
-from database_operations import get_db_connection, get_table_names, get_table_data, get_table_row_count
-from data_processor import initialize_database, update_ons_data, update_ccee_data
+from database_operations import get_db_connection, get_table_names, get_table_data, get_table_row_count, get_wide_data, DASHBOARD_CHARTS
+from data_processor import initialize_database, update_all_data, backfill_gaps
+from gap_detector import get_cached_gaps, refresh_gap_cache
+from rate_limiter import get_rate_limit_metrics
+from table_catalog import get_table_info, build_select
+from analytics_mirror import read_table as read_mirror_table, table_stats as mirror_table_stats, is_long_range, bootstrap_all
 
 app = Flask(__name__)
 app.config.from_pyfile('config.py')
@@ -26,6 +31,14 @@ def list_tables():
     except Exception as e:
         return render_template('error.html', error=f"Erro ao acessar o banco de dados: {str(e)}") 
 
+# API de listagem de tabelas
+@app.route('/api/tabelas')
+def api_tables():
+    try:
+        return jsonify(get_table_names())
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 # Tela 3 – Visualização de Dados de Tabela
 @app.route('/tabelas/<table_name>')
 def table_data(table_name):
@@ -36,49 +49,48 @@ def table_data(table_name):
         start_date = request.args.get('start_date')
         end_date = request.args.get('end_date')
 
+        # Colunas e coluna de data vêm do catálogo em cache (valida a tabela)
+        info = get_table_info(table_name)
+        columns = info['columns']
+        filtered = info['date_column'] and (start_date or end_date)
+
+        query, params = build_select(
+            table_name,
+            start_date=start_date,
+            end_date=end_date,
+            limit=per_page,
+            offset=(page - 1) * per_page
+        )
+
         conn = get_db_connection()
         cursor = conn.cursor()
 
-        # Descobrir colunas
-        cursor.execute(f"SELECT * FROM {table_name} LIMIT 0")
-        columns = [desc[0] for desc in cursor.description]
-
-        # Construir consulta base
-        query = f"SELECT * FROM {table_name}"
-        count_query = f"SELECT COUNT(*) FROM {table_name}"
-        conditions = []
-        params = []
-
-        # Adicionar filtros de data se fornecidos
-        date_column = None
-        for col in columns:
-            if col.lower() in ['date', 'data', 'timestamp', 'datetime']:
-                date_column = col
-                break
-
-        if date_column:
-            if start_date:
-                conditions.append(f"{date_column} >= %s")
-                params.append(start_date)
-            if end_date:
-                conditions.append(f"{date_column} <= %s")
-                params.append(end_date)
-
-        if conditions:
-            where_clause = " WHERE " + " AND ".join(conditions)
-            query += where_clause
-            count_query += where_clause
-
-        # Adicionar paginação
-        query += f" LIMIT {per_page} OFFSET {(page - 1) * per_page}"
-
         # Executar consultas
         cursor.execute(query, params)
         data = cursor.fetchall()
 
-        cursor.execute(count_query, params)
-        total_count = cursor.fetchone()[0]
+        # Sem filtro, em tabelas grandes, a estimativa do catálogo evita um
+        # COUNT(*) na tabela inteira; a tela a exibe como aproximada
+        estimate = info['row_estimate']
+        total_is_estimate = bool(not filtered and estimate and estimate > app.config['EXACT_COUNT_THRESHOLD'])
+        if total_is_estimate and len(data) < per_page and (data or page == 1):
+            # Página incompleta: é a última, e o total exato sai dela
+            total_count = (page - 1) * per_page + len(data)
+            total_is_estimate = False
+        elif total_is_estimate and data:
+            total_count = estimate
+        else:
+            # Filtro, tabela pequena ou página além do fim: contagem exata
+            total_is_estimate = False
+            count_query, count_params = build_select(
+                table_name, start_date=start_date, end_date=end_date, count=True
+            )
+            cursor.execute(count_query, count_params)
+            total_count = cursor.fetchone()[0]
         total_pages = (total_count + per_page - 1) // per_page
+        if total_is_estimate:
+            # Página cheia: a estimativa pode estar abaixo do real, mantém a próxima acessível
+            total_pages = max(total_pages, page + 1)
 
         conn.close()
 
@@ -89,6 +101,8 @@ def table_data(table_name):
             data=data,
             page=page,
             total_pages=total_pages,
+            total_count=total_count,
+            total_is_estimate=total_is_estimate,
             start_date=start_date,
             end_date=end_date
         )
@@ -103,52 +117,38 @@ def export_csv(table_name):
         start_date = request.args.get('start_date')
         end_date = request.args.get('end_date')
         
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        # Primeiro, descubra o nome da coluna de data
-        cursor.execute(f"SELECT * FROM {table_name} LIMIT 0")
-        columns = [desc[0] for desc in cursor.description]
-        
-        # Encontrar a coluna de data
-        date_column = None
-        for col in columns:
-            if col.lower() in ['date', 'data', 'timestamp', 'datetime']:
-                date_column = col
-                break
-        
-        # Construir consulta com filtros de data se fornecidos
-        query = f"SELECT * FROM {table_name}"
-        conditions = []
-        params = []
-        
-        if date_column:
-            if start_date:
-                conditions.append(f"{date_column} >= %s")
-                params.append(start_date)
-            if end_date:
-                conditions.append(f"{date_column} <= %s")
-                params.append(end_date)
-        
-        if conditions:
-            query += " WHERE " + " AND ".join(conditions)
-        
-        # Executar a consulta e obter os dados
-        cursor.execute(query, params)
-        data = cursor.fetchall()
-        
-        conn.close()
-        
-        # Criar arquivo CSV em memória
+        # Valida a tabela no catálogo antes de qualquer leitura
+        info = get_table_info(table_name)
+
+        # Exportações são varreduras completas: tenta primeiro o espelho colunar
+        df = read_mirror_table(table_name, start_date=start_date, end_date=end_date)
+
         output = io.StringIO()
-        writer = csv.writer(output)
-        
-        # Escrever cabeçalho
-        writer.writerow(columns)
-        
-        # Escrever dados
-        for row in data:
-            writer.writerow(row)
+
+        if df is not None:
+            df.to_csv(output, index=False)
+        else:
+            columns = info['columns']
+            query, params = build_select(table_name, start_date=start_date, end_date=end_date)
+            
+            conn = get_db_connection()
+            cursor = conn.cursor()
+            
+            # Executar a consulta e obter os dados
+            cursor.execute(query, params)
+            data = cursor.fetchall()
+            
+            conn.close()
+            
+            # Criar arquivo CSV em memória
+            writer = csv.writer(output)
+            
+            # Escrever cabeçalho
+            writer.writerow(columns)
+            
+            # Escrever dados
+            for row in data:
+                writer.writerow(row)
         
         output.seek(0)
         
@@ -179,56 +179,39 @@ def dashboard():
 @app.route('/api/dashboard/<chart_type>')
 def api_dashboard(chart_type):
     try:
-        conn = get_db_connection()
-
-        # Mapeia a tabela e colunas por tipo de gráfico
-        if chart_type == 'pld':
-            base_query = "SELECT date, submarket, pld FROM pld_submarket"
-        elif chart_type == 'ena':
-            base_query = "SELECT date, submarket, ena FROM ena_submarket"
-        elif chart_type == 'ear':
-            base_query = "SELECT date, submarket, ear FROM ear_submarket"
-        elif chart_type == 'cmo':
-            base_query = "SELECT date, submarket, cmo FROM cmo_submarket"
-        elif chart_type == 'geracao':
-            base_query = """
-                SELECT date, submarket, hydro, thermal, wind, solar
-                FROM energy_balance
-            """
-        else:
+        if chart_type not in DASHBOARD_CHARTS:
             return jsonify({'error': 'Tipo de gráfico não suportado'}), 400
 
-        # Filtros
-        conditions = []
-        params = []
+        table_name, columns = DASHBOARD_CHARTS[chart_type]
 
         start = request.args.get('start')  # 'YYYY-MM-DD'
         end = request.args.get('end')      # 'YYYY-MM-DD'
         subs = request.args.get('subs')    # 'NORTH,NORTHEAST,...'
 
-        if start:
-            conditions.append("date >= %s")
-            params.append(f"{start} 00:00:00")
-        if end:
-            conditions.append("date <= %s")
-            params.append(f"{end} 23:59:59")
+        start_ts = f"{start} 00:00:00" if start else None
+        end_ts = f"{end} 23:59:59" if end else None
+        subs_list = [s.strip() for s in subs.split(',') if s.strip()] if subs else []
 
-        if subs:
-            subs_list = [s.strip() for s in subs.split(',') if s.strip()]
-            if subs_list:
-                # constrói IN (%s,%s,...) seguro
-                placeholders = ",".join(["%s"] * len(subs_list))
-                conditions.append(f"submarket IN ({placeholders})")
-                params.extend(subs_list)
+        # Períodos longos são lidos do espelho Parquet/DuckDB quando disponível
+        df = None
+        if is_long_range(start, end):
+            df = read_mirror_table(table_name, columns, start_ts, end_ts, subs_list)
 
-        where_clause = f" WHERE {' AND '.join(conditions)}" if conditions else ""
-        order_clause = " ORDER BY date"
+        if df is None:
+            query, params = build_select(
+                table_name,
+                columns=columns,
+                start_date=start_ts,
+                end_date=end_ts,
+                submarkets=subs_list,
+                order_by_date=True
+            )
 
-        full_query = base_query + where_clause + order_clause
+            conn = get_db_connection()
 
-        # usa pandas para executar com parâmetros
-        df = pd.read_sql(full_query, conn, params=params)
-        conn.close()
+            # usa pandas para executar com parâmetros
+            df = pd.read_sql(query.as_string(conn), conn, params=params)
+            conn.close()
 
         result = df.to_dict(orient='records')
 
@@ -241,6 +224,36 @@ def api_dashboard(chart_type):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+# API para a visão larga (todas as medidas alinhadas por submercado e hora)
+@app.route('/api/wide')
+def api_wide():
+    try:
+        start = request.args.get('start')  # 'YYYY-MM-DD'
+        end = request.args.get('end')      # 'YYYY-MM-DD'
+        subs = request.args.get('subs')    # 'NORTH,NORTHEAST,...'
+        cols = request.args.get('cols')    # 'pld,cmo,ear,...'
+
+        subs_list = [s.strip() for s in subs.split(',') if s.strip()] if subs else None
+        cols_list = [c.strip().lower() for c in cols.split(',') if c.strip()] if cols else None
+
+        columns, data = get_wide_data(
+            columns=cols_list,
+            start_date=f"{start} 00:00:00" if start else None,
+            end_date=f"{end} 23:59:59" if end else None,
+            submarkets=subs_list
+        )
+
+        result = []
+        for row in data:
+            item = dict(zip(columns, row))
+            if hasattr(item['date'], 'strftime'):
+                item['date'] = item['date'].strftime('%Y-%m-%d %H:%M:%S')
+            result.append(item)
+
+        return jsonify(result)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 # Tela 5 – Administração/Status
 @app.route('/admin')
 def admin():
@@ -254,10 +267,19 @@ def admin():
         table_stats = {}
         
         for table in tables:
-            cursor.execute(f"SELECT COUNT(*) FROM {table}")
-            count = cursor.fetchone()[0]
-            cursor.execute(f"SELECT MAX(date) FROM {table}")
-            last_date = cursor.fetchone()[0]
+            # Agregados vêm do espelho colunar quando disponível
+            stats = mirror_table_stats(table)
+            if stats:
+                count, last_date = stats
+            else:
+                cursor.execute(*build_select(table, count=True))
+                count = cursor.fetchone()[0]
+                date_column = get_table_info(table)['date_column']
+                last_date = None
+                if date_column:
+                    cursor.execute(sql.SQL("SELECT MAX({}) FROM {}").format(
+                        sql.Identifier(date_column), sql.Identifier(table)))
+                    last_date = cursor.fetchone()[0]
             
             table_stats[table] = {
                 'count': count,
@@ -265,8 +287,11 @@ def admin():
             }
         
         conn.close()
+
+        # Lacunas por série: resumo da última detecção, sem varrer as tabelas aqui
+        gap_cache = get_cached_gaps()
         
-        return render_template('admin.html', table_stats=table_stats)
+        return render_template('admin.html', table_stats=table_stats, gap_cache=gap_cache)
     except Exception as e:
         return render_template('error.html', error=f"Erro ao acessar painel administrativo: {str(e)}")
 
@@ -288,12 +313,9 @@ def init_db():
 @app.route('/api/update', methods=['POST'])
 def manual_update():
     try:
-        # Executar atualizações em threads separadas
-        thread_ons = Thread(target=update_ons_data)
-        thread_ccee = Thread(target=update_ccee_data)
-        
-        thread_ons.start()
-        thread_ccee.start()
+        # ONS e CCEE rodam em paralelo; submarket_wide é realinhada uma vez ao final
+        thread = Thread(target=update_all_data)
+        thread.start()
         
         return jsonify({
             'status': 'success', 
@@ -302,6 +324,50 @@ def manual_update():
     except Exception as e:
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
+# Exportação inicial do PostgreSQL para o espelho colunar
+@app.route('/api/mirror/bootstrap', methods=['POST'])
+def mirror_bootstrap():
+    try:
+        thread = Thread(target=bootstrap_all)
+        thread.start()
+        return jsonify({
+            'status': 'success',
+            'message': 'Exportação para o espelho colunar iniciada em background. As leituras seguem no PostgreSQL até o fim.'
+        })
+    except Exception as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+# Preenchimento das lacunas detectadas
+@app.route('/api/backfill', methods=['POST'])
+def manual_backfill():
+    try:
+        thread = Thread(target=backfill_gaps)
+        thread.start()
+        return jsonify({
+            'status': 'success',
+            'message': 'Preenchimento de lacunas iniciado em background. Apenas os trechos afetados serão baixados novamente.'
+        })
+    except Exception as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+# Nova detecção de lacunas (atualiza o resumo exibido no painel)
+@app.route('/api/gaps/refresh', methods=['POST'])
+def refresh_gaps():
+    try:
+        thread = Thread(target=refresh_gap_cache)
+        thread.start()
+        return jsonify({
+            'status': 'success',
+            'message': 'Verificação de lacunas iniciada em background. Recarregue o painel em instantes.'
+        })
+    except Exception as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+# Métricas do limitador de taxa das fontes externas
+@app.route('/api/rate-limits')
+def api_rate_limits():
+    return jsonify(get_rate_limit_metrics())
+
 # Rota para health check
 @app.route('/health')
 def health_check():
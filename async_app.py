@@ -0,0 +1,154 @@
+"""Modo assíncrono para os endpoints somente leitura.
+
+Serve /api/dashboard/<tipo>, /api/wide, /api/tabelas e /health com Quart
+(mesma API do Flask) e um pool asyncpg próprio, de modo que consultas lentas
+não prendem uma thread de worker. As rotas de escrita e as telas HTML
+continuam no app.py.
+
+Execução em produção (vários workers):
+    hypercorn async_app:app --workers 4 --bind 0.0.0.0:5001
+    gunicorn -w 4 -b 0.0.0.0:5000 app:app        # caminho síncrono
+
+Comparação de carga entre os dois: python load_test.py
+"""
+import asyncio
+from datetime import datetime
+
+import asyncpg
+from quart import Quart, request, jsonify
+
+from config import DB_CONFIG, ASYNC_POOL_MIN_SIZE, ASYNC_POOL_MAX_SIZE
+from database_operations import DASHBOARD_CHARTS, WIDE_COLUMNS
+from table_catalog import list_tables, build_select
+from analytics_mirror import read_table as read_mirror_table, is_long_range
+
+app = Quart(__name__)
+app.config.from_pyfile('config.py')
+
+pool = None
+
+@app.before_serving
+async def create_pool():
+    global pool
+    pool = await asyncpg.create_pool(
+        database=DB_CONFIG['dbname'],
+        user=DB_CONFIG['user'],
+        password=DB_CONFIG['password'],
+        host=DB_CONFIG['host'],
+        port=int(DB_CONFIG['port']),
+        min_size=ASYNC_POOL_MIN_SIZE,
+        max_size=ASYNC_POOL_MAX_SIZE
+    )
+
+@app.after_serving
+async def close_pool():
+    await pool.close()
+
+def parse_filters(args):
+    """Converte start/end/subs da query string em (início, fim, submercados) para o asyncpg"""
+    start = args.get('start')  # 'YYYY-MM-DD'
+    end = args.get('end')      # 'YYYY-MM-DD'
+    subs = args.get('subs')    # 'NORTH,NORTHEAST,...'
+
+    # asyncpg exige datetime para colunas TIMESTAMP
+    start_dt = datetime.strptime(f"{start} 00:00:00", '%Y-%m-%d %H:%M:%S') if start else None
+    end_dt = datetime.strptime(f"{end} 23:59:59", '%Y-%m-%d %H:%M:%S') if end else None
+    subs_list = [s.strip() for s in subs.split(',') if s.strip()] if subs else []
+    return start_dt, end_dt, subs_list
+
+def records_to_json(records):
+    result = []
+    for record in records:
+        item = dict(record)
+        if hasattr(item.get('date'), 'strftime'):
+            item['date'] = item['date'].strftime('%Y-%m-%d %H:%M:%S')
+        result.append(item)
+    return result
+
+# API para dados do dashboard
+@app.route('/api/dashboard/<chart_type>')
+async def api_dashboard(chart_type):
+    try:
+        if chart_type not in DASHBOARD_CHARTS:
+            return jsonify({'error': 'Tipo de gráfico não suportado'}), 400
+
+        table_name, columns = DASHBOARD_CHARTS[chart_type]
+        start_dt, end_dt, subs_list = parse_filters(request.args)
+
+        # Mesmo critério do app.py: períodos longos vão ao espelho Parquet/DuckDB,
+        # lido numa thread para não bloquear o loop
+        if is_long_range(request.args.get('start'), request.args.get('end')):
+            df = await asyncio.to_thread(
+                read_mirror_table, table_name, columns,
+                start_dt.strftime('%Y-%m-%d %H:%M:%S') if start_dt else None,
+                end_dt.strftime('%Y-%m-%d %H:%M:%S') if end_dt else None,
+                subs_list
+            )
+            if df is not None:
+                return jsonify(records_to_json(df.to_dict(orient='records')))
+
+        # Consulta montada pelo mesmo construtor do app.py (o catálogo pode ir ao banco)
+        query, params = await asyncio.to_thread(
+            build_select, table_name,
+            columns=columns,
+            start_date=start_dt,
+            end_date=end_dt,
+            submarkets=subs_list,
+            order_by_date=True,
+            paramstyle='numeric'
+        )
+
+        async with pool.acquire() as conn:
+            records = await conn.fetch(query, *params)
+
+        return jsonify(records_to_json(records))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# API para a visão larga
+@app.route('/api/wide')
+async def api_wide():
+    try:
+        cols = request.args.get('cols')  # 'pld,cmo,ear,...'
+        cols_list = [c.strip().lower() for c in cols.split(',') if c.strip()] if cols else []
+        columns = [c for c in cols_list if c in WIDE_COLUMNS] or WIDE_COLUMNS
+
+        start_dt, end_dt, subs_list = parse_filters(request.args)
+        query, params = await asyncio.to_thread(
+            build_select, 'submarket_wide',
+            columns=['date', 'submarket'] + columns,
+            start_date=start_dt,
+            end_date=end_dt,
+            submarkets=subs_list,
+            order_by=['date', 'submarket'],
+            paramstyle='numeric'
+        )
+
+        async with pool.acquire() as conn:
+            records = await conn.fetch(query, *params)
+
+        return jsonify(records_to_json(records))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# Listagem de tabelas
+@app.route('/api/tabelas')
+async def api_tables():
+    try:
+        # Mesmo catálogo em cache do app.py (tabelas-base, em ordem alfabética)
+        return jsonify(await asyncio.to_thread(list_tables))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# Rota para health check
+@app.route('/health')
+async def health_check():
+    try:
+        async with pool.acquire() as conn:
+            await conn.fetchval("SELECT 1")
+        return jsonify({'status': 'healthy', 'database': 'connected'})
+    except Exception as e:
+        return jsonify({'status': 'unhealthy', 'database': 'disconnected', 'error': str(e)}), 500
+
+if __name__ == '__main__':
+    app.run(debug=app.config['DEBUG'], host='0.0.0.0', port=5001)
@@ -17,14 +17,53 @@ HEADERS = {
 }
 
 # Configuração de retry para requisições
+# 429 e 503 ficam de fora: são tratados pelo limitador de taxa (rate_limiter.py)
 from urllib3.util.retry import Retry
 RETRY_STRATEGY = Retry(
     total=3,
     backoff_factor=1,
-    status_forcelist=[429, 500, 502, 503, 504],
+    status_forcelist=[500, 502, 504],
     allowed_methods=["GET"]
 )
 
+# Limitador de taxa por host (token bucket com ajuste AIMD)
+RATE_LIMIT_INITIAL = 5.0        # requisições por segundo no início
+RATE_LIMIT_MIN = 0.2
+RATE_LIMIT_MAX = 50.0
+RATE_LIMIT_INCREASE = 0.5       # aumento aditivo (req/s por segundo sem throttling)
+RATE_LIMIT_DECREASE = 0.5       # fator multiplicativo ao receber 429/503
+RATE_LIMIT_MAX_CONCURRENCY = 4  # requisições simultâneas por host
+RATE_LIMIT_MAX_ATTEMPTS = 6     # tentativas por requisição sob throttling
+RATE_LIMIT_METRICS_WINDOW = 60  # segundos considerados nas métricas de vazão
+
+# Espelho colunar (Parquet + DuckDB) para consultas analíticas pesadas
+ANALYTICS_MIRROR_ENABLED = True
+PARQUET_DIR = 'parquet'
+ANALYTICS_MIN_DAYS = 90  # períodos maiores que isso são lidos do espelho
+MIRROR_ROW_TOLERANCE = 0.05  # diferença aceita entre o espelho e pg_class.reltuples
+
+# Pool do modo assíncrono (async_app.py, asyncpg)
+ASYNC_POOL_MIN_SIZE = 2
+ASYNC_POOL_MAX_SIZE = 10
+
+# Índice das páginas do datastore_search da CCEE (usado no preenchimento de lacunas)
+CCEE_PAGE_INDEX_PATH = 'ccee_page_index.json'
+
+# Atraso de publicação tolerado no fim das séries antes de apontar lacuna final
+GAP_PUBLICATION_LAG_DAYS = 2
+# Resultado da última detecção de lacunas, lido pelo painel administrativo
+GAP_CACHE_PATH = 'gap_cache.json'
+
+# Arquivo das respostas brutas (páginas CKAN e planilhas ONS) para reprocessamento
+ARCHIVE_ENABLED = True
+ARCHIVE_DIR = 'raw_archive'
+
+# Catálogo de tabelas em cache (table_catalog.py)
+CATALOG_TTL = 300  # segundos até reler o schema do banco
+CATALOG_MISS_RELOAD_INTERVAL = 10  # intervalo mínimo entre recargas por tabela desconhecida
+EXACT_COUNT_THRESHOLD = 100000  # abaixo disso a paginação usa COUNT(*) em vez da estimativa
+ROW_ESTIMATE_MAX_STALE = 0.1    # fração de linhas alteradas desde o ANALYZE que descarta a estimativa
+
 # Configuração da aplicação Flask
 SECRET_KEY = 'sua_chave_secreta_aqui'
 DEBUG = True
\ No newline at end of file
@@ -1,16 +1,38 @@
+import os
+import json
 import requests
 import pandas as pd
 from datetime import datetime
 from io import BytesIO
 from requests.adapters import HTTPAdapter
-from config import REQUEST_TIMEOUT, HEADERS, RETRY_STRATEGY
-from database_operations import get_db_connection, safe_insert, create_tables
+from threading import Thread
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from config import REQUEST_TIMEOUT, HEADERS, RETRY_STRATEGY, CCEE_PAGE_INDEX_PATH, RATE_LIMIT_MAX_CONCURRENCY
+from database_operations import get_db_connection, safe_insert, create_tables, refresh_submarket_wide
+from analytics_mirror import write_parquet_mirror
+from gap_detector import detect_gaps, detect_all_gaps, refresh_gap_cache
+from rate_limiter import rate_limited_get
+from raw_archive import archive_response, read_manifest, load_object
+
+# Registros por página do datastore_search
+PAGE_LIMIT = 10000
+# Falhas consecutivas após as quais o restante de um recurso não é mais tentado
+MAX_FALHAS_SEGUIDAS = 3
+
+def pagina_para_df(data, key, offset, limite):
+    """Converte a resposta JSON de uma página do datastore_search em DataFrame"""
+    registros = data["result"].get("records", [])
+    # Marca a origem de cada registro para permitir reprocessar só a página
+    return pd.DataFrame(registros).assign(_resource_id=key, _offset=offset, _limit=limite)
 
 class dadosAbertosSetorEletrico:
     def __init__(self, instituicao: str):
         self.api = '/api/3/action/'
+        self.instituicao = str.lower(instituicao)
         self.session = requests.Session()
         self.session.mount('https://', HTTPAdapter(max_retries=RETRY_STRATEGY))
+        # (resource_id, offset, limite) das páginas que não puderam ser baixadas
+        self.paginas_com_falha = []
 
         if str.lower(instituicao) == "ccee":
             self.host = 'https://dadosabertos.ccee.org.br'
@@ -23,7 +45,8 @@ class dadosAbertosSetorEletrico:
 
     def __request_with_retry(self, url):
         try:
-            response = self.session.get(
+            response = rate_limited_get(
+                self.session,
                 url,
                 headers=HEADERS,
                 timeout=REQUEST_TIMEOUT
@@ -46,8 +69,64 @@ class dadosAbertosSetorEletrico:
             return []
         return [item['id'] for item in response.json()['result']['resources'] if 'id' in item]
 
+    def __baixar_pagina(self, produto, key, offset, limite):
+        """Baixa uma página do datastore_search de um recurso do produto.
+
+        Retorna (DataFrame, total de registros do recurso); em caso de falha
+        retorna (None, None) e registra a página em self.paginas_com_falha.
+        """
+        url = self.host + self.api + f"datastore_search?resource_id={key}&limit={limite}&offset={offset}"
+        response = self.__request_with_retry(url)
+        data = response.json() if response else {}
+        if not data.get("success", False):
+            if response:
+                print(f"Resposta inválida para recurso {key}")
+            self.paginas_com_falha.append((key, offset, limite))
+            return None, None
+
+        if data["result"].get("records"):
+            archive_response(
+                f"{self.instituicao}_page", url, response.content,
+                {'produto': produto, 'resource_id': key, 'offset': offset, 'limit': limite}
+            )
+
+        return pagina_para_df(data, key, offset, limite), data["result"].get("total")
+
+    def baixar_recurso(self, produto, key, limite=PAGE_LIMIT):
+        """Baixa todas as páginas de um recurso.
+
+        Uma página que falha não interrompe o recurso: enquanto o total de
+        registros (result.total) for conhecido, as páginas seguintes continuam
+        sendo baixadas. Após MAX_FALHAS_SEGUIDAS falhas consecutivas o restante
+        do recurso é registrado como falho, sem novas requisições.
+        """
+        paginas = []
+        offset = 0
+        total = None
+        falhas_seguidas = 0
+
+        while total is None or offset < total:
+            pagina, total_recurso = self.__baixar_pagina(produto, key, offset, limite)
+            if pagina is None:
+                falhas_seguidas += 1
+                # Sem o total (falha na primeira página) não há como saber o fim do recurso
+                if total is None:
+                    break
+                if falhas_seguidas >= MAX_FALHAS_SEGUIDAS:
+                    self.paginas_com_falha.extend(
+                        (key, restante, limite) for restante in range(offset + limite, total, limite))
+                    break
+            else:
+                falhas_seguidas = 0
+                total = total_recurso if total_recurso is not None else total
+                if pagina.empty:
+                    break
+                paginas.append(pagina)
+            offset += limite
+
+        return paginas
+
     def baixar_dados_produto_completo(self, produto: str):
-        limite = 10000
         lista_dfs = []
         resource_ids = self.__buscar_resource_ids_por_produto(produto)
 
@@ -55,25 +134,23 @@ class dadosAbertosSetorEletrico:
             print(f"Nenhum resource_id encontrado para o produto {produto}")
             return pd.DataFrame()
 
-        for key in resource_ids:
-            offset = 0
-            while True:
-                url = self.host + self.api + f"datastore_search?resource_id={key}&limit={limite}&offset={offset}"
-                response = self.__request_with_retry(url)
-                if not response:
-                    break
+        # Recursos são baixados em paralelo; o limitador do host regula o ritmo
+        with ThreadPoolExecutor(max_workers=RATE_LIMIT_MAX_CONCURRENCY) as executor:
+            for paginas in executor.map(lambda key: self.baixar_recurso(produto, key), resource_ids):
+                lista_dfs.extend(paginas)
 
-                data = response.json()
-                if not data.get("success", False):
-                    print(f"Resposta inválida para recurso {key}")
-                    break
+        if self.paginas_com_falha:
+            print(f"{len(self.paginas_com_falha)} páginas de {produto} falharam e ficam para o preenchimento de lacunas")
 
-                registros = data["result"].get("records", [])
-                if not registros:
-                    break
+        return pd.concat(lista_dfs, ignore_index=True) if lista_dfs else pd.DataFrame()
 
-                lista_dfs.append(pd.DataFrame(registros))
-                offset += limite
+    def baixar_paginas(self, produto, paginas):
+        """Baixa apenas as páginas (resource_id, offset, limite) informadas do produto"""
+        lista_dfs = []
+        with ThreadPoolExecutor(max_workers=RATE_LIMIT_MAX_CONCURRENCY) as executor:
+            for pagina, _ in executor.map(lambda p: self.__baixar_pagina(produto, *p), paginas):
+                if pagina is not None and not pagina.empty:
+                    lista_dfs.append(pagina)
 
         return pd.concat(lista_dfs, ignore_index=True) if lista_dfs else pd.DataFrame()
 
@@ -87,59 +164,83 @@ def process_ons_data(year, data_type):
             'balance': f'https://ons-aws-prod-opendata.s3.amazonaws.com/dataset/balanco_energia_subsistema_ho/BALANCO_ENERGIA_SUBSISTEMA_{year}.xlsx'
         }
 
-        response = requests.get(url_map[data_type])
+        response = rate_limited_get(requests, url_map[data_type])
         response.raise_for_status()
-        df = pd.read_excel(BytesIO(response.content))
-
-        # Processamento comum
-        submarket_translation = {
-            'NORDESTE': 'NORTHEAST',
-            'NORTE': 'NORTH',
-            'SUDESTE': 'SOUTHEAST',
-            'SUDESTE/CENTRO-OESTE': 'SOUTHEAST',
-            'SUL': 'SOUTH'
-        }
-
-        # Processamento específico
-        if data_type == 'ear':
-            df = df[['id_subsistema', 'nom_subsistema', 'ear_data', 'ear_verif_subsistema_mwmes']]
-            df.columns = ['id_subsistema', 'Submarket', 'Date', 'EAR']
-            df['EAR'] = pd.to_numeric(df['EAR'].astype(str).str.replace(',', '.'), errors='coerce')
-
-        elif data_type == 'ena':
-            df = df[['id_subsistema', 'nom_subsistema', 'ena_data', 'ena_armazenavel_regiao_mwmed']]
-            df.columns = ['id_subsistema', 'Submarket', 'Date', 'ENA']
-            df['ENA'] = pd.to_numeric(df['ENA'].astype(str).str.replace(',', '.'), errors='coerce')
-
-        elif data_type == 'cmo':
-            df = df[['id_subsistema', 'nom_subsistema', 'din_instante', 'val_cmo']]
-            df.columns = ['id_subsistema', 'Submarket', 'Date', 'CMO']
-            df = df[pd.to_datetime(df['Date']).dt.minute == 0]  # Filtra horas inteiras
-            df['CMO'] = pd.to_numeric(df['CMO'].astype(str).str.replace(',', '.'), errors='coerce')
-
-        elif data_type == 'balance':
-            df = df[['id_subsistema', 'nom_subsistema', 'din_instante',
-                     'val_gerhidraulica', 'val_gertermica', 'val_gereolica',
-                     'val_gersolar', 'val_carga', 'val_intercambio']]
-            df.columns = ['id_subsistema', 'Submarket', 'Date',
-                          'Hydro', 'Thermal', 'Wind',
-                          'Solar', 'Load', 'Exchange']
-            for col in ['Hydro', 'Thermal', 'Wind', 'Solar', 'Load', 'Exchange']:
-                df[col] = pd.to_numeric(df[col].astype(str).str.replace(',', '.'), errors='coerce')
-
-        # Processamento comum
-        df['Submarket'] = df['Submarket'].replace(submarket_translation)
-        df['Date'] = pd.to_datetime(df['Date'])
-        return df.dropna()
+        archive_response('ons_workbook', url_map[data_type], response.content,
+                         {'year': year, 'data_type': data_type})
+        return transform_ons_data(response.content, data_type)
 
     except Exception as e:
         print(f"Erro processando {data_type} para {year}: {str(e)}")
         return pd.DataFrame()
 
-def update_ons_data():
-    """Atualiza todos os dados do ONS"""
+def transform_ons_data(content, data_type):
+    """Converte uma planilha bruta do ONS para o formato da tabela de destino"""
+    df = pd.read_excel(BytesIO(content))
+
+    # Processamento comum
+    submarket_translation = {
+        'NORDESTE': 'NORTHEAST',
+        'NORTE': 'NORTH',
+        'SUDESTE': 'SOUTHEAST',
+        'SUDESTE/CENTRO-OESTE': 'SOUTHEAST',
+        'SUL': 'SOUTH'
+    }
+
+    # Processamento específico
+    if data_type == 'ear':
+        df = df[['id_subsistema', 'nom_subsistema', 'ear_data', 'ear_verif_subsistema_mwmes']]
+        df.columns = ['id_subsistema', 'Submarket', 'Date', 'EAR']
+        df['EAR'] = pd.to_numeric(df['EAR'].astype(str).str.replace(',', '.'), errors='coerce')
+
+    elif data_type == 'ena':
+        df = df[['id_subsistema', 'nom_subsistema', 'ena_data', 'ena_armazenavel_regiao_mwmed']]
+        df.columns = ['id_subsistema', 'Submarket', 'Date', 'ENA']
+        df['ENA'] = pd.to_numeric(df['ENA'].astype(str).str.replace(',', '.'), errors='coerce')
+
+    elif data_type == 'cmo':
+        df = df[['id_subsistema', 'nom_subsistema', 'din_instante', 'val_cmo']]
+        df.columns = ['id_subsistema', 'Submarket', 'Date', 'CMO']
+        df = df[pd.to_datetime(df['Date']).dt.minute == 0]  # Filtra horas inteiras
+        df['CMO'] = pd.to_numeric(df['CMO'].astype(str).str.replace(',', '.'), errors='coerce')
+
+    elif data_type == 'balance':
+        df = df[['id_subsistema', 'nom_subsistema', 'din_instante',
+                 'val_gerhidraulica', 'val_gertermica', 'val_gereolica',
+                 'val_gersolar', 'val_carga', 'val_intercambio']]
+        df.columns = ['id_subsistema', 'Submarket', 'Date',
+                      'Hydro', 'Thermal', 'Wind',
+                      'Solar', 'Load', 'Exchange']
+        for col in ['Hydro', 'Thermal', 'Wind', 'Solar', 'Load', 'Exchange']:
+            df[col] = pd.to_numeric(df[col].astype(str).str.replace(',', '.'), errors='coerce')
+
+    # Processamento comum
+    df['Submarket'] = df['Submarket'].replace(submarket_translation)
+    df['Date'] = pd.to_datetime(df['Date'])
+    return df.dropna()
+
+# Tabela de destino de cada tipo de dado do ONS
+ONS_TABLES = {
+    'ear': 'ear_submarket',
+    'ena': 'ena_submarket',
+    'cmo': 'cmo_submarket',
+    'balance': 'energy_balance'
+}
+
+def earliest_date(inserted):
+    """Menor data entre os DataFrames devolvidos por safe_insert, ou None"""
+    dates = [df['date'].min() for df in inserted if not df.empty]
+    return min(dates) if dates else None
+
+def update_ons_data(refresh=True):
+    """Atualiza todos os dados do ONS
+
+    Retorna a menor data efetivamente inserida (None se nada mudou). Com
+    refresh=False, a atualização de submarket_wide fica a cargo do chamador.
+    """
     conn = get_db_connection()
     current_year = datetime.now().year
+    inserted = []
 
     # Para teste, vamos processar apenas o ano atual
     for year in range(current_year, current_year + 1):
@@ -147,74 +248,354 @@ def update_ons_data():
 
         for data_type in ['ear', 'ena', 'cmo', 'balance']:
             df = process_ons_data(year, data_type)
-            table_name = {
-                'ear': 'ear_submarket',
-                'ena': 'ena_submarket',
-                'cmo': 'cmo_submarket',
-                'balance': 'energy_balance'
-            }[data_type]
-            safe_insert(df, table_name, conn)
-
+            table_name = ONS_TABLES[data_type]
+            inserted.append(safe_insert(df, table_name, conn))
+            write_parquet_mirror(inserted[-1], table_name)
+
+    # Realinha a visão larga apenas a partir do que foi inserido
+    start = earliest_date(inserted)
+    if refresh and start is not None:
+        refresh_submarket_wide(conn, start)
     conn.close()
+    return start
+
+# Produto da CCEE carregado em pld_submarket
+CCEE_PLD_PRODUTO = 'pld_horario_submercado'
+
+# Colunas que identificam a página de origem de cada registro da CCEE
+PAGE_COLUMNS = ['_resource_id', '_offset', '_limit']
+
+def transform_ccee_pld(df):
+    """Converte os registros brutos de PLD da CCEE para o formato de pld_submarket"""
+    # Converter período para dia e hora
+    df['Dia'] = (df['PERIODO_COMERCIALIZACAO'] - 1) // 24 + 1
+    df['Hora'] = (df['PERIODO_COMERCIALIZACAO'] - 1) % 24
+
+    # Criar data completa
+    df['Date'] = pd.to_datetime(
+        df['MES_REFERENCIA'].astype(str) +
+        df['Dia'].astype(str).str.zfill(2),
+        format='%Y%m%d', errors='coerce'
+    ) + pd.to_timedelta(df['Hora'], unit='h')
+
+    # Padronizar nomes dos submercados
+    df['SUBMERCADO'] = df['SUBMERCADO'].str.replace('/', '').str.strip()
+
+    # Mapeamento completo
+    submarket_mapping = {
+        'NORDESTE': ('NE', 'NORTHEAST'),
+        'NORTE': ('N', 'NORTH'),
+        'SUDESTECENTROOESTE': ('SE', 'SOUTHEAST'),
+        'SUDESTE': ('SE', 'SOUTHEAST'),
+        'SUL': ('S', 'SOUTH')
+    }
+
+    # Mapear com tratamento de erros
+    df['id_subsistema'] = df['SUBMERCADO'].apply(
+        lambda x: submarket_mapping.get(x, ('Unknown', 'Unknown'))[0])
+    df['Submarket'] = df['SUBMERCADO'].apply(
+        lambda x: submarket_mapping.get(x, ('Unknown', 'Unknown'))[1]
+    )
+
+    # Verificar submercados não mapeados
+    unicos = df[df['id_subsistema'] == 'Unknown']['SUBMERCADO'].unique()
+    if len(unicos) > 0:
+        print(f"Submercados não mapeados encontrados: {unicos}")
+
+    # Filtrar e formatar, mantendo a página de origem quando disponível
+    df = df[df['id_subsistema'] != 'Unknown']
+    df = df[['id_subsistema', 'Submarket', 'Date', 'PLD'] + [c for c in PAGE_COLUMNS if c in df.columns]]
+    df['Date'] = pd.to_datetime(df['Date'])
+    return df
+
+def save_ccee_page_index(df, failed=(), retried=()):
+    """Mescla no índice o intervalo de datas coberto por cada página da CCEE.
+
+    Páginas presentes em `df` substituem a entrada anterior; as páginas de
+    `failed` ((resource_id, offset, limite)) ficam marcadas com failed=True,
+    mantendo as datas já conhecidas, para serem tentadas no preenchimento
+    de lacunas. Páginas de `retried` que desta vez não falharam perdem a
+    marca. As demais entradas do índice são preservadas.
+    """
+    pages = {(page['resource_id'], page['offset'], page['limit']): page for page in load_ccee_page_index()}
+
+    for key in set(retried) - set(failed):
+        page = pages.get(key)
+        if page is None:
+            continue
+        if page['min_date'] is None:
+            del pages[key]
+        else:
+            page['failed'] = False
 
-def update_ccee_data():
-    """Atualiza dados da CCEE (PLD) com tratamento completo"""
+    if not df.empty:
+        index = (df.groupby(PAGE_COLUMNS)['Date']
+                   .agg(['min', 'max'])
+                   .reset_index())
+        for row in index.to_dict(orient='records'):
+            key = (row['_resource_id'], int(row['_offset']), int(row['_limit']))
+            pages[key] = {
+                'resource_id': key[0],
+                'offset': key[1],
+                'limit': key[2],
+                'min_date': row['min'].isoformat(),
+                'max_date': row['max'].isoformat(),
+                'failed': False
+            }
+
+    for resource_id, offset, limite in failed:
+        page = pages.setdefault((resource_id, offset, limite), {
+            'resource_id': resource_id,
+            'offset': offset,
+            'limit': limite,
+            'min_date': None,
+            'max_date': None
+        })
+        page['failed'] = True
+
+    tmp_path = CCEE_PAGE_INDEX_PATH + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(sorted(pages.values(), key=lambda page: (page['resource_id'], page['offset'])), f)
+    os.replace(tmp_path, CCEE_PAGE_INDEX_PATH)
+
+def load_ccee_page_index():
+    if not os.path.exists(CCEE_PAGE_INDEX_PATH):
+        return []
+    with open(CCEE_PAGE_INDEX_PATH) as f:
+        return json.load(f)
+
+def failed_ccee_pages():
+    """Páginas (resource_id, offset, limite) marcadas como falhas no índice"""
+    return [(page['resource_id'], page['offset'], page['limit'])
+            for page in load_ccee_page_index() if page.get('failed')]
+
+def update_ccee_data(refresh=True):
+    """Atualiza dados da CCEE (PLD) com tratamento completo
+
+    Retorna a menor data efetivamente inserida (None se nada mudou). Com
+    refresh=False, a atualização de submarket_wide fica a cargo do chamador.
+    """
     print("\nProcessando dados CCEE...")
     cliente = dadosAbertosSetorEletrico("ccee")
-    df = cliente.baixar_dados_produto_completo("pld_horario_submercado")
+    df = cliente.baixar_dados_produto_completo(CCEE_PLD_PRODUTO)
     print(f"Total de registros brutos baixados: {len(df)}")
     
     if not df.empty:
         try:
-            # Converter período para dia e hora
-            df['Dia'] = (df['PERIODO_COMERCIALIZACAO'] - 1) // 24 + 1
-            df['Hora'] = (df['PERIODO_COMERCIALIZACAO'] - 1) % 24
-
-            # Criar data completa
-            df['Date'] = pd.to_datetime(
-                df['MES_REFERENCIA'].astype(str) +
-                df['Dia'].astype(str).str.zfill(2),
-                format='%Y%m%d', errors='coerce'
-            ) + pd.to_timedelta(df['Hora'], unit='h')
-
-            # Padronizar nomes dos submercados
-            df['SUBMERCADO'] = df['SUBMERCADO'].str.replace('/', '').str.strip()
-
-            # Mapeamento completo
-            submarket_mapping = {
-                'NORDESTE': ('NE', 'NORTHEAST'),
-                'NORTE': ('N', 'NORTH'),
-                'SUDESTECENTROOESTE': ('SE', 'SOUTHEAST'),
-                'SUDESTE': ('SE', 'SOUTHEAST'),
-                'SUL': ('S', 'SOUTH')
-            }
-
-            # Mapear com tratamento de erros
-            df['id_subsistema'] = df['SUBMERCADO'].apply(
-                lambda x: submarket_mapping.get(x, ('Unknown', 'Unknown'))[0])
-            df['Submarket'] = df['SUBMERCADO'].apply(
-                lambda x: submarket_mapping.get(x, ('Unknown', 'Unknown'))[1]
-            )
-
-            # Verificar submercados não mapeados
-            unicos = df[df['id_subsistema'] == 'Unknown']['SUBMERCADO'].unique()
-            if len(unicos) > 0:
-                print(f"Submercados não mapeados encontrados: {unicos}")
+            df = transform_ccee_pld(df)
+            save_ccee_page_index(df, cliente.paginas_com_falha)
+            df = df.drop(columns=PAGE_COLUMNS)
 
-            # Filtrar e formatar
-            df = df[df['id_subsistema'] != 'Unknown']
-            df = df[['id_subsistema', 'Submarket', 'Date', 'PLD']]
-            df['Date'] = pd.to_datetime(df['Date'])
-
-            # Inserir no banco
+            # Inserir no banco; o produto vem completo a cada carga, então a
+            # visão larga é atualizada só a partir das linhas realmente novas
             conn = get_db_connection()
-            safe_insert(df, 'pld_submarket', conn)
+            inserted = safe_insert(df, 'pld_submarket', conn)
+            write_parquet_mirror(inserted, 'pld_submarket')
+            start = earliest_date([inserted])
+            if refresh and start is not None:
+                refresh_submarket_wide(conn, start)
             conn.close()
+            return start
 
         except Exception as e:
             print(f"Erro crítico: {str(e)}")
     else:
         print("Nenhum dado CCEE encontrado.")
+        if cliente.paginas_com_falha:
+            save_ccee_page_index(df, cliente.paginas_com_falha)
+    return None
+
+def update_all_data():
+    """Atualiza ONS e CCEE em paralelo e realinha submarket_wide uma única vez"""
+    starts = []
+    threads = [
+        Thread(target=lambda: starts.append(update_ons_data(refresh=False))),
+        Thread(target=lambda: starts.append(update_ccee_data(refresh=False)))
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    starts = [start for start in starts if start is not None]
+    if starts:
+        conn = get_db_connection()
+        refresh_submarket_wide(conn, min(starts))
+        conn.close()
+    refresh_gap_cache()
+
+def backfill_ons_gaps(gaps, conn):
+    """Baixa novamente apenas os arquivos anuais do ONS que contêm lacunas"""
+    inserted = []
+    for data_type, table_name in ONS_TABLES.items():
+        table_gaps = gaps.get(table_name)
+        if table_gaps is None or table_gaps.empty:
+            continue
+
+        years = sorted({
+            year
+            for gap in table_gaps.itertuples()
+            for year in range(gap.gap_start.year, gap.gap_end.year + 1)
+        })
+        for year in years:
+            print(f"Preenchendo lacunas de {table_name} em {year}...")
+            df = process_ons_data(year, data_type)
+            inserted.append(safe_insert(df, table_name, conn))
+            write_parquet_mirror(inserted[-1], table_name)
+    return inserted
+
+def _baixar_paginas_ccee(pages, resources, conn, retried=()):
+    """Baixa as páginas e recursos da CCEE indicados, atualiza o índice e grava o PLD"""
+    print(f"Preenchendo lacunas do PLD com {len(pages)} páginas e {len(resources)} recursos da CCEE...")
+    cliente = dadosAbertosSetorEletrico("ccee")
+    lista_dfs = [cliente.baixar_paginas(CCEE_PLD_PRODUTO, sorted(pages))]
+    for resource_id in resources:
+        lista_dfs.extend(cliente.baixar_recurso(CCEE_PLD_PRODUTO, resource_id))
+    df = pd.concat(lista_dfs, ignore_index=True)
+
+    if df.empty:
+        save_ccee_page_index(df, cliente.paginas_com_falha, retried)
+        return pd.DataFrame()
+
+    df = transform_ccee_pld(df)
+    save_ccee_page_index(df, cliente.paginas_com_falha, retried)
+    df = df.drop(columns=PAGE_COLUMNS)
+    inserted = safe_insert(df, 'pld_submarket', conn)
+    write_parquet_mirror(inserted, 'pld_submarket')
+    return inserted
+
+def backfill_ccee_gaps(gaps, conn):
+    """Baixa novamente apenas as páginas do datastore_search que cobrem as lacunas.
+
+    Páginas marcadas como falhas no índice são tentadas primeiro (uma falha
+    na primeira página de um recurso leva ao recurso inteiro) e as lacunas
+    são detectadas de novo em seguida, já que o buraco deixado por uma página
+    falha não aparece no índice. Só lacunas que continuam sem explicação,
+    sem páginas falhas pendentes, levam a uma nova carga completa.
+    Retorna a lista de DataFrames gravados.
+    """
+    inserted = []
+
+    failed = failed_ccee_pages()
+    if failed:
+        pages = {page for page in failed if page[1] > 0}
+        resources = sorted({page[0] for page in failed if page[1] == 0})
+        inserted.append(_baixar_paginas_ccee(pages, resources, conn, retried=failed))
+        gaps = detect_gaps('pld_submarket')
+
+    if gaps is None or gaps.empty:
+        return inserted
+
+    index = load_ccee_page_index()
+    pending = failed_ccee_pages()
+    pages = set()
+    uncovered = False
+
+    for gap in gaps.itertuples():
+        hits = [
+            (page['resource_id'], page['offset'], page['limit'])
+            for page in index
+            if page['min_date'] is not None
+            and pd.Timestamp(page['min_date']) <= gap.gap_end and pd.Timestamp(page['max_date']) >= gap.gap_start
+        ]
+        pages.update(hits)
+        uncovered = uncovered or not hits
+
+    if uncovered and pending:
+        # O buraco pode ser das páginas que ainda falham; elas voltam na próxima execução
+        print(f"Lacunas do PLD fora das páginas conhecidas com {len(pending)} páginas ainda falhando; "
+              "carga completa adiada")
+    elif uncovered:
+        print("Lacunas do PLD fora das páginas conhecidas; recarregando produto completo")
+        start = update_ccee_data(refresh=False)
+        if start is not None:
+            inserted.append(pd.DataFrame({'date': [start]}))
+        return inserted
+
+    if pages:
+        inserted.append(_baixar_paginas_ccee(pages, [], conn))
+    return inserted
+
+def backfill_gaps(gaps=None):
+    """Detecta lacunas (se não informadas) e recarrega só os trechos afetados"""
+    gaps = gaps if gaps is not None else detect_all_gaps()
+    if all(table_gaps.empty for table_gaps in gaps.values()) and not failed_ccee_pages():
+        print("Nenhuma lacuna encontrada.")
+        refresh_gap_cache(gaps)
+        return
+
+    conn = get_db_connection()
+    inserted = backfill_ons_gaps(gaps, conn)
+    inserted.extend(backfill_ccee_gaps(gaps.get('pld_submarket'), conn))
+    start = earliest_date(inserted)
+    if start is not None:
+        refresh_submarket_wide(conn, start)
+    conn.close()
+    refresh_gap_cache()
+
+def _reprocess_ons_entry(entry):
+    """Planilha arquivada -> (tabela, DataFrame); roda nos processos auxiliares"""
+    data_type = entry['meta']['data_type']
+    try:
+        return ONS_TABLES[data_type], transform_ons_data(load_object(entry['sha256']), data_type)
+    except Exception as e:
+        print(f"Erro reprocessando {entry['key']}: {str(e)}")
+        return ONS_TABLES[data_type], pd.DataFrame()
+
+def _reprocess_ccee_entry(entry):
+    """Página arquivada do datastore_search -> DataFrame bruto"""
+    meta = entry['meta']
+    try:
+        data = json.loads(load_object(entry['sha256']))
+        return pagina_para_df(data, meta['resource_id'], meta['offset'], meta['limit'])
+    except Exception as e:
+        print(f"Erro reprocessando {entry['key']}: {str(e)}")
+        return pd.DataFrame()
+
+def reprocess_archive(workers=4):
+    """Reaplica a transformação e a carga sobre o arquivo bruto, sem acessar a rede.
+
+    As planilhas e páginas são transformadas em paralelo e gravadas com
+    upsert, de modo que mudanças na transformação substituem os valores
+    antigos no banco e no espelho colunar.
+    """
+    conn = get_db_connection()
+    inserted = []
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        ons_entries = read_manifest('ons_workbook')
+        print(f"Reprocessando {len(ons_entries)} planilhas do ONS...")
+        for table_name, df in executor.map(_reprocess_ons_entry, ons_entries):
+            if df.empty:
+                continue
+            inserted.append(safe_insert(df, table_name, conn, upsert=True))
+            write_parquet_mirror(inserted[-1], table_name)
+
+        # Só as páginas do produto de PLD passam por transform_ccee_pld
+        ccee_entries = read_manifest('ccee_page')
+        pld_entries = [entry for entry in ccee_entries if entry['meta'].get('produto') == CCEE_PLD_PRODUTO]
+        if len(pld_entries) < len(ccee_entries):
+            print(f"Ignorando {len(ccee_entries) - len(pld_entries)} páginas da CCEE de outros produtos ou sem produto no manifesto")
+        ccee_entries = pld_entries
+        print(f"Reprocessando {len(ccee_entries)} páginas da CCEE...")
+        paginas = [df for df in executor.map(_reprocess_ccee_entry, ccee_entries) if not df.empty]
+
+    if paginas:
+        try:
+            df = transform_ccee_pld(pd.concat(paginas, ignore_index=True))
+            save_ccee_page_index(df)
+            df = df.drop(columns=PAGE_COLUMNS)
+            inserted.append(safe_insert(df, 'pld_submarket', conn, upsert=True))
+            write_parquet_mirror(inserted[-1], 'pld_submarket')
+        except Exception as e:
+            print(f"Erro crítico: {str(e)}")
+
+    start = earliest_date(inserted)
+    if start is not None:
+        refresh_submarket_wide(conn, start)
+    conn.close()
+    refresh_gap_cache()
+    print("Reprocessamento concluído!")
 
 def initialize_database():
     """Função principal para inicializar o banco de dados"""
@@ -222,6 +603,7 @@ def initialize_database():
     create_tables()
     update_ons_data()
     update_ccee_data()
+    refresh_gap_cache()
     print("Banco de dados inicializado com sucesso!")
 
 # Ponto de entrada para teste
@@ -236,6 +618,7 @@ if __name__ == "__main__":
     print("Processando dados do ONS (todos os anos)...")
     conn = get_db_connection()
     current_year = datetime.now().year
+    inserted = []
     
     for year in range(2010, current_year + 1):
         print(f"\nProcessando ONS ano {year}...")
@@ -249,11 +632,15 @@ if __name__ == "__main__":
                     'cmo': 'cmo_submarket',
                     'balance': 'energy_balance'
                 }[data_type]
-                safe_insert(df, table_name, conn)
+                inserted.append(safe_insert(df, table_name, conn))
+                write_parquet_mirror(inserted[-1], table_name)
                 print(f"  {data_type.upper()}: {len(df)} registros inseridos")
             else:
                 print(f"  {data_type.upper()}: Nenhum dado encontrado")
 
+    start = earliest_date(inserted)
+    if start is not None:
+        refresh_submarket_wide(conn, start)
     conn.close()
     
     # Processar dados da CCEE
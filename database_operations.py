@@ -1,44 +1,19 @@
-import psycopg2
-from config import DB_CONFIG
-
-def get_db_connection():
-    """Retorna conexão com o PostgreSQL"""
-    return psycopg2.connect(**DB_CONFIG)
+import pandas as pd
+from psycopg2.extras import execute_values
+from datetime import datetime
+from db_connection import get_db_connection
+from table_catalog import list_tables, build_select, invalidate_catalog
 
 def get_table_names():
-    """Retorna lista de tabelas disponíveis"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("""
-        SELECT table_name 
-        FROM information_schema.tables 
-        WHERE table_schema = 'public'
-    """)
-    tables = [row[0] for row in cursor.fetchall()]
-    conn.close()
-    return tables
+    """Retorna lista de tabelas disponíveis (lida do catálogo em cache)"""
+    return list_tables()
 
 def get_table_data(table_name, limit, offset, start_date=None, end_date=None):
     conn = get_db_connection()
     cursor = conn.cursor()
     
-    query = f"SELECT * FROM {table_name}"
-    conditions = []
-    params = {}
-    
-    if start_date:
-        conditions.append("date >= %(start_date)s")
-        params['start_date'] = start_date
-    if end_date:
-        conditions.append("date <= %(end_date)s")
-        params['end_date'] = end_date
-    
-    if conditions:
-        query += " WHERE " + " AND ".join(conditions)
-    
-    query += " LIMIT %(limit)s OFFSET %(offset)s"
-    params['limit'] = limit
-    params['offset'] = offset
+    query, params = build_select(table_name, start_date=start_date, end_date=end_date,
+                                 limit=limit, offset=offset)
     
     cursor.execute(query, params)
     data = cursor.fetchall()
@@ -50,19 +25,7 @@ def get_table_row_count(table_name, start_date=None, end_date=None):
     conn = get_db_connection()
     cursor = conn.cursor()
     
-    query = f"SELECT COUNT(*) FROM {table_name}"
-    conditions = []
-    params = {}
-    
-    if start_date:
-        conditions.append("date >= %(start_date)s")
-        params['start_date'] = start_date
-    if end_date:
-        conditions.append("date <= %(end_date)s")
-        params['end_date'] = end_date
-    
-    if conditions:
-        query += " WHERE " + " AND ".join(conditions)
+    query, params = build_select(table_name, start_date=start_date, end_date=end_date, count=True)
     
     cursor.execute(query, params)
     count = cursor.fetchone()[0]
@@ -129,6 +92,34 @@ def create_tables():
             exchange REAL,
             UNIQUE (id_subsistema, date)
         )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS submarket_wide
+        (
+            id_subsistema TEXT,
+            submarket TEXT,
+            date TIMESTAMP,
+            pld REAL,
+            cmo REAL,
+            ear REAL,
+            ena REAL,
+            hydro REAL,
+            thermal REAL,
+            wind REAL,
+            solar REAL,
+            load REAL,
+            exchange REAL,
+            UNIQUE (id_subsistema, date)
+        )
+        """,
+        """
+        CREATE INDEX IF NOT EXISTS submarket_wide_submarket_date_idx
+        ON submarket_wide (submarket, date)
+        """,
+        # Consultas só por período (sem submercado) ordenadas por date, submarket
+        """
+        CREATE INDEX IF NOT EXISTS submarket_wide_date_submarket_idx
+        ON submarket_wide (date, submarket)
         """
     ]
 
@@ -144,30 +135,171 @@ def create_tables():
     cursor.close()
     conn.close()
 
-def safe_insert(df, table_name, conn):
-    """Insere dados de forma segura no PostgreSQL"""
+    # O schema pode ter mudado: o catálogo será recarregado no próximo acesso
+    invalidate_catalog()
+
+def safe_insert(df, table_name, conn, upsert=False):
+    """Insere dados de forma segura no PostgreSQL
+
+    Com upsert=True, registros já existentes são sobrescritos (usado no
+    reprocessamento do arquivo bruto após mudanças na transformação) e
+    chaves repetidas no próprio DataFrame ficam só com a última ocorrência.
+    Retorna um DataFrame com as linhas efetivamente gravadas (vazio se nada
+    mudou ou se houve erro), para que as etapas seguintes trabalhem só com
+    o que o banco aceitou.
+    """
     if df.empty:
-        return
+        return pd.DataFrame()
+
+    if upsert:
+        # DO UPDATE não aceita a mesma chave duas vezes no mesmo comando;
+        # a última ocorrência prevalece
+        key = [col for col in df.columns if col.lower() in ('id_subsistema', 'date')]
+        df = df.drop_duplicates(subset=key, keep='last')
 
     cursor = conn.cursor()
     tuples = [tuple(x) for x in df.to_numpy()]
     cols = ','.join(df.columns)
 
+    conflict_action = "DO NOTHING"
+    if upsert:
+        updates = ','.join(
+            f"{col} = EXCLUDED.{col}"
+            for col in df.columns
+            if col.lower() not in ('id_subsistema', 'date')
+        )
+        conflict_action = f"DO UPDATE SET {updates}"
+
     query = f"""
         INSERT INTO {table_name} ({cols})
-        VALUES ({','.join(['%s'] * len(df.columns))})
-        ON CONFLICT (id_subsistema, date) DO NOTHING
+        VALUES %s
+        ON CONFLICT (id_subsistema, date) {conflict_action}
+        RETURNING *
     """
 
     try:
-        cursor.executemany(query, tuples)
+        rows = execute_values(cursor, query, tuples, page_size=1000, fetch=True)
+        columns = [desc[0] for desc in cursor.description]
         conn.commit()
-        print(f"Inserted {cursor.rowcount} rows into {table_name}")
+        print(f"Inserted {len(rows)} rows into {table_name}")
+        return pd.DataFrame(rows, columns=columns)
     except Exception as e:
+        conn.rollback()
         print(f"Database error: {e}")
+        return pd.DataFrame()
     finally:
         cursor.close()
 
+# Mapeia a tabela e colunas por tipo de gráfico do dashboard
+DASHBOARD_CHARTS = {
+    'pld': ('pld_submarket', ['date', 'submarket', 'pld']),
+    'ena': ('ena_submarket', ['date', 'submarket', 'ena']),
+    'ear': ('ear_submarket', ['date', 'submarket', 'ear']),
+    'cmo': ('cmo_submarket', ['date', 'submarket', 'cmo']),
+    'geracao': ('energy_balance', ['date', 'submarket', 'hydro', 'thermal', 'wind', 'solar']),
+}
+
+# Medidas da visão larga, na ordem das colunas de submarket_wide
+WIDE_COLUMNS = ['pld', 'cmo', 'ear', 'ena', 'hydro', 'thermal', 'wind', 'solar', 'load', 'exchange']
+
+def refresh_submarket_wide(conn, start_date=None):
+    """Atualiza incrementalmente a tabela submarket_wide a partir de start_date.
+
+    Alinha todas as medidas no eixo horário (id_subsistema, date): as séries
+    horárias (PLD, CMO, balanço) são unidas pela hora exata e as diárias
+    (EAR, ENA) pelo dia da hora. Sem start_date, recomeça um dia antes da
+    última data já materializada para absorver dados que chegaram atrasados.
+    """
+    cursor = conn.cursor()
+
+    query = """
+        INSERT INTO submarket_wide (id_subsistema, submarket, date,
+                                    pld, cmo, ear, ena,
+                                    hydro, thermal, wind, solar, load, exchange)
+        SELECT h.id_subsistema, h.submarket, h.date,
+               p.pld, c.cmo, ear.ear, ena.ena,
+               b.hydro, b.thermal, b.wind, b.solar, b.load, b.exchange
+        FROM (
+            SELECT id_subsistema, MAX(submarket) AS submarket, date
+            FROM (
+                SELECT id_subsistema, submarket, date FROM pld_submarket WHERE date >= %(start)s
+                UNION ALL
+                SELECT id_subsistema, submarket, date FROM cmo_submarket WHERE date >= %(start)s
+                UNION ALL
+                SELECT id_subsistema, submarket, date FROM energy_balance WHERE date >= %(start)s
+                UNION ALL
+                SELECT id_subsistema, submarket, date FROM ear_submarket WHERE date >= %(start)s
+                UNION ALL
+                SELECT id_subsistema, submarket, date FROM ena_submarket WHERE date >= %(start)s
+            ) AS eixo
+            GROUP BY id_subsistema, date
+        ) AS h
+        LEFT JOIN pld_submarket p
+            ON p.id_subsistema = h.id_subsistema AND p.date = h.date
+        LEFT JOIN cmo_submarket c
+            ON c.id_subsistema = h.id_subsistema AND c.date = h.date
+        LEFT JOIN energy_balance b
+            ON b.id_subsistema = h.id_subsistema AND b.date = h.date
+        LEFT JOIN ear_submarket ear
+            ON ear.id_subsistema = h.id_subsistema AND ear.date = date_trunc('day', h.date)
+        LEFT JOIN ena_submarket ena
+            ON ena.id_subsistema = h.id_subsistema AND ena.date = date_trunc('day', h.date)
+        ON CONFLICT (id_subsistema, date) DO UPDATE SET
+            submarket = EXCLUDED.submarket,
+            pld = EXCLUDED.pld,
+            cmo = EXCLUDED.cmo,
+            ear = EXCLUDED.ear,
+            ena = EXCLUDED.ena,
+            hydro = EXCLUDED.hydro,
+            thermal = EXCLUDED.thermal,
+            wind = EXCLUDED.wind,
+            solar = EXCLUDED.solar,
+            load = EXCLUDED.load,
+            exchange = EXCLUDED.exchange
+    """
+
+    try:
+        # Serializa as atualizações concorrentes (cargas do ONS e da CCEE,
+        # preenchimento de lacunas); a trava é liberada no commit/rollback
+        cursor.execute("SELECT pg_advisory_xact_lock(hashtext('submarket_wide'))")
+
+        if start_date is None:
+            cursor.execute("SELECT MAX(date) - INTERVAL '1 day' FROM submarket_wide")
+            start_date = cursor.fetchone()[0]
+        if start_date is None:
+            start_date = datetime(1900, 1, 1)
+
+        cursor.execute(query, {'start': start_date})
+        conn.commit()
+        print(f"Atualizadas {cursor.rowcount} linhas em submarket_wide a partir de {start_date}")
+    except Exception as e:
+        conn.rollback()
+        print(f"Erro ao atualizar submarket_wide: {e}")
+    finally:
+        cursor.close()
+
+def get_wide_data(columns=None, start_date=None, end_date=None, submarkets=None):
+    """Retorna medidas alinhadas de submarket_wide com uma única consulta"""
+    columns = [c for c in (columns or WIDE_COLUMNS) if c in WIDE_COLUMNS] or WIDE_COLUMNS
+
+    query, params = build_select(
+        'submarket_wide',
+        columns=['date', 'submarket'] + columns,
+        start_date=start_date,
+        end_date=end_date,
+        submarkets=submarkets,
+        order_by=['date', 'submarket']
+    )
+
+    conn = get_db_connection()
+    cursor = conn.cursor()
+
+    cursor.execute(query, params)
+    data = cursor.fetchall()
+    result_columns = [desc[0] for desc in cursor.description]
+    conn.close()
+    return result_columns, data
+
 # Ponto de entrada para teste
 if __name__ == "__main__":
     print("Criando tabelas no banco de dados...")
@@ -0,0 +1,6 @@
+import psycopg2
+from config import DB_CONFIG
+
+def get_db_connection():
+    """Retorna conexão com o PostgreSQL"""
+    return psycopg2.connect(**DB_CONFIG)
@@ -0,0 +1,134 @@
+import os
+import json
+import threading
+from datetime import datetime
+import pandas as pd
+from config import GAP_PUBLICATION_LAG_DAYS, GAP_CACHE_PATH
+from database_operations import get_db_connection
+from analytics_mirror import read_table as read_mirror_table
+
+# Granularidade esperada de cada série ('h' = horária, 'D' = diária)
+TABLE_FREQUENCY = {
+    'pld_submarket': 'h',
+    'cmo_submarket': 'h',
+    'energy_balance': 'h',
+    'ear_submarket': 'D',
+    'ena_submarket': 'D'
+}
+
+GAP_COLUMNS = ['id_subsistema', 'submarket', 'gap_start', 'gap_end', 'missing']
+
+# Lacunas listadas por tabela no resumo gravado em cache
+GAP_CACHE_ROWS = 20
+
+_cache_lock = threading.Lock()
+
+def _load_keys(table_name):
+    """Lê apenas (id_subsistema, submarket, date), preferindo o espelho colunar"""
+    df = read_mirror_table(table_name, columns=['id_subsistema', 'submarket', 'date'])
+    if df is not None:
+        return df
+
+    conn = get_db_connection()
+    df = pd.read_sql(f"SELECT id_subsistema, submarket, date FROM {table_name}", conn)
+    conn.close()
+    return df
+
+def expected_end(freq, now=None):
+    """Último período que já deveria estar publicado, alinhado à granularidade"""
+    now = pd.Timestamp(now) if now is not None else pd.Timestamp.now()
+    return (now - pd.Timedelta(days=GAP_PUBLICATION_LAG_DAYS)).floor(freq)
+
+def find_gaps(df, freq, end=None):
+    """Encontra lacunas em uma série já carregada.
+
+    Compara cada data com a anterior do mesmo submercado; qualquer salto
+    maior que a granularidade esperada vira uma lacuna [gap_start, gap_end]
+    com o número de períodos ausentes. Com `end`, a última data de cada
+    submercado também é comparada com ele, apontando a lacuna final.
+    """
+    if df.empty:
+        return pd.DataFrame(columns=GAP_COLUMNS)
+
+    step = pd.Timedelta(1, unit=freq)
+    df = (df.assign(date=pd.to_datetime(df['date']))
+            .drop_duplicates(subset=['id_subsistema', 'date'])
+            .sort_values(['id_subsistema', 'date']))
+
+    previous = df.groupby('id_subsistema')['date'].shift()
+    delta = df['date'] - previous
+    mask = delta > step
+
+    gaps = pd.DataFrame({
+        'id_subsistema': df.loc[mask, 'id_subsistema'],
+        'submarket': df.loc[mask, 'submarket'],
+        'gap_start': previous[mask] + step,
+        'gap_end': df.loc[mask, 'date'] - step,
+        'missing': (delta[mask] // step - 1).astype(int)
+    })
+
+    if end is not None:
+        end = pd.Timestamp(end)
+        last = df.groupby('id_subsistema').tail(1)
+        last = last[last['date'] < end]
+        trailing = pd.DataFrame({
+            'id_subsistema': last['id_subsistema'],
+            'submarket': last['submarket'],
+            'gap_start': last['date'] + step,
+            'gap_end': end,
+            'missing': ((end - last['date']) // step).astype(int)
+        })
+        gaps = pd.concat([gaps, trailing]) if not gaps.empty else trailing
+
+    return gaps.reset_index(drop=True)
+
+def detect_gaps(table_name):
+    """Retorna as lacunas de uma tabela monitorada, inclusive a final"""
+    freq = TABLE_FREQUENCY[table_name]
+    return find_gaps(_load_keys(table_name), freq, expected_end(freq))
+
+def detect_all_gaps():
+    """Retorna {tabela: DataFrame de lacunas} para todas as séries monitoradas"""
+    gaps = {}
+    for table_name in TABLE_FREQUENCY:
+        try:
+            gaps[table_name] = detect_gaps(table_name)
+        except Exception as e:
+            print(f"Erro ao detectar lacunas em {table_name}: {e}")
+            gaps[table_name] = pd.DataFrame(columns=GAP_COLUMNS)
+    return gaps
+
+def refresh_gap_cache(gaps=None):
+    """Recalcula as lacunas (se não informadas) e grava o resumo em GAP_CACHE_PATH.
+
+    Chamado ao fim das cargas, do preenchimento de lacunas e do
+    reprocessamento, e sob demanda pelo painel; o painel apenas lê o arquivo.
+    """
+    gaps = gaps if gaps is not None else detect_all_gaps()
+    summary = {'computed_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'), 'tables': {}}
+
+    for table_name, table_gaps in gaps.items():
+        rows = table_gaps.head(GAP_CACHE_ROWS).to_dict(orient='records')
+        for row in rows:
+            row['gap_start'] = row['gap_start'].strftime('%Y-%m-%d %H:%M')
+            row['gap_end'] = row['gap_end'].strftime('%Y-%m-%d %H:%M')
+            row['missing'] = int(row['missing'])
+        summary['tables'][table_name] = {
+            'gaps': len(table_gaps),
+            'missing': int(table_gaps['missing'].sum()) if not table_gaps.empty else 0,
+            'rows': rows
+        }
+
+    with _cache_lock:
+        tmp_path = GAP_CACHE_PATH + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(summary, f)
+        os.replace(tmp_path, GAP_CACHE_PATH)
+    return gaps
+
+def get_cached_gaps():
+    """Retorna o resumo da última detecção, ou None se ela ainda não foi feita"""
+    if not os.path.exists(GAP_CACHE_PATH):
+        return None
+    with open(GAP_CACHE_PATH) as f:
+        return json.load(f)
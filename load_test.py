@@ -0,0 +1,57 @@
+import time
+import statistics
+import argparse
+import requests
+from concurrent.futures import ThreadPoolExecutor
+
+# Endpoints somente leitura servidos pelos dois caminhos (app.py e async_app.py)
+ENDPOINTS = [
+    '/health',
+    '/api/tabelas',
+    '/api/dashboard/pld?start=2024-01-01&end=2024-12-31',
+    '/api/dashboard/geracao?start=2024-01-01&end=2024-03-31&subs=SOUTHEAST,SOUTH',
+]
+
+def medir(base_url, concorrencia, total):
+    """Dispara `total` requisições com `concorrencia` clientes simultâneos"""
+    latencias = []
+    erros = 0
+
+    def chamar(i):
+        url = base_url + ENDPOINTS[i % len(ENDPOINTS)]
+        inicio = time.perf_counter()
+        try:
+            ok = requests.get(url, timeout=60).status_code == 200
+        except requests.exceptions.RequestException:
+            ok = False
+        return time.perf_counter() - inicio, ok
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concorrencia) as executor:
+        for latencia, ok in executor.map(chamar, range(total)):
+            latencias.append(latencia)
+            erros += 0 if ok else 1
+    duracao = time.perf_counter() - inicio
+
+    latencias.sort()
+    return {
+        'req/s': total / duracao,
+        'p50 (ms)': statistics.median(latencias) * 1000,
+        'p95 (ms)': latencias[int(len(latencias) * 0.95) - 1] * 1000,
+        'erros': erros
+    }
+
+# Ponto de entrada para teste
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compara os caminhos síncrono e assíncrono sob carga")
+    parser.add_argument('--sync-url', default='http://localhost:5000')
+    parser.add_argument('--async-url', default='http://localhost:5001')
+    parser.add_argument('--concorrencia', type=int, default=32)
+    parser.add_argument('--total', type=int, default=500)
+    args = parser.parse_args()
+
+    for nome, base_url in [('síncrono', args.sync_url), ('assíncrono', args.async_url)]:
+        print(f"\nCaminho {nome} ({base_url})...")
+        resultado = medir(base_url, args.concorrencia, args.total)
+        for chave, valor in resultado.items():
+            print(f"  {chave}: {valor:.1f}" if isinstance(valor, float) else f"  {chave}: {valor}")
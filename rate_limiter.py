@@ -0,0 +1,189 @@
+import time
+import threading
+from collections import deque
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+
+import requests
+
+from config import (RATE_LIMIT_INITIAL, RATE_LIMIT_MIN, RATE_LIMIT_MAX,
+                    RATE_LIMIT_INCREASE, RATE_LIMIT_DECREASE,
+                    RATE_LIMIT_MAX_CONCURRENCY, RATE_LIMIT_MAX_ATTEMPTS,
+                    RATE_LIMIT_METRICS_WINDOW)
+
+# Respostas que indicam que a fonte está pedindo para reduzir o ritmo
+THROTTLE_STATUS = (429, 503)
+
+class HostRateLimiter:
+    """Token bucket com ajuste AIMD e limite de concorrência para um host.
+
+    Cada resposta bem-sucedida aumenta a taxa de forma aditiva; cada 429/503
+    corta a taxa pela metade (multiplicativo) e, se houver Retry-After,
+    suspende o host inteiro até o prazo indicado.
+    """
+
+    def __init__(self, host):
+        self.host = host
+        self.rate = RATE_LIMIT_INITIAL  # requisições por segundo
+        self.tokens = 1.0
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.lock = threading.Lock()
+        self.slots = threading.BoundedSemaphore(RATE_LIMIT_MAX_CONCURRENCY)
+
+        # Métricas: totais desde o início e eventos (instante, tipo) da janela recente
+        self.started = time.monotonic()
+        self.requests = 0
+        self.throttled = 0
+        self.errors = 0
+        self.in_flight = 0
+        self.events = deque()
+
+    def _wait_token(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                if now < self.blocked_until:
+                    wait = self.blocked_until - now
+                else:
+                    burst = max(self.rate, 1.0)
+                    self.tokens = min(burst, self.tokens + (now - self.updated) * self.rate)
+                    self.updated = now
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return
+                    wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+    @contextmanager
+    def slot(self):
+        """Ocupa uma vaga de concorrência e um token antes da requisição"""
+        self.slots.acquire()
+        try:
+            self._wait_token()
+            with self.lock:
+                self.in_flight += 1
+            yield
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+            self.slots.release()
+
+    def _record(self, kind):
+        # Chamado com self.lock adquirido
+        now = time.monotonic()
+        self.events.append((now, kind))
+        self._prune(now)
+
+    def _prune(self, now):
+        while self.events and self.events[0][0] < now - RATE_LIMIT_METRICS_WINDOW:
+            self.events.popleft()
+
+    def on_success(self):
+        with self.lock:
+            self.requests += 1
+            self._record('success')
+            # Aumento aditivo de ~RATE_LIMIT_INCREASE req/s a cada segundo de tráfego
+            self.rate = min(RATE_LIMIT_MAX, self.rate + RATE_LIMIT_INCREASE / max(self.rate, 1.0))
+
+    def on_throttle(self, retry_after=None):
+        with self.lock:
+            self.requests += 1
+            self.throttled += 1
+            self._record('throttled')
+            self.rate = max(RATE_LIMIT_MIN, self.rate * RATE_LIMIT_DECREASE)
+            self.tokens = 0.0
+            if retry_after:
+                self.blocked_until = max(self.blocked_until, time.monotonic() + retry_after)
+
+    def on_error(self):
+        with self.lock:
+            self.requests += 1
+            self.errors += 1
+            self._record('error')
+
+    def metrics(self):
+        """Totais desde o início e contagens da janela de RATE_LIMIT_METRICS_WINDOW segundos.
+
+        `throughput` e `throttled_per_s` usam só a janela, de modo que refletem
+        o ritmo atual e não a média da vida do processo.
+        """
+        with self.lock:
+            now = time.monotonic()
+            self._prune(now)
+            window = max(min(RATE_LIMIT_METRICS_WINDOW, now - self.started), 1.0)
+            window_throttled = sum(1 for _, kind in self.events if kind == 'throttled')
+            window_errors = sum(1 for _, kind in self.events if kind == 'error')
+            return {
+                'host': self.host,
+                'rate': round(self.rate, 2),
+                'in_flight': self.in_flight,
+                'requests': self.requests,
+                'throttled': self.throttled,
+                'errors': self.errors,
+                'window_seconds': RATE_LIMIT_METRICS_WINDOW,
+                'window_requests': len(self.events),
+                'window_throttled': window_throttled,
+                'window_errors': window_errors,
+                'throughput': round(len(self.events) / window, 2),
+                'throttled_per_s': round(window_throttled / window, 2),
+                'blocked_for': round(max(0.0, self.blocked_until - now), 1)
+            }
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+def get_limiter(host):
+    """Retorna o limitador compartilhado do host (um por processo)"""
+    with _limiters_lock:
+        if host not in _limiters:
+            _limiters[host] = HostRateLimiter(host)
+        return _limiters[host]
+
+def get_rate_limit_metrics():
+    with _limiters_lock:
+        limiters = list(_limiters.values())
+    return [limiter.metrics() for limiter in limiters]
+
+def parse_retry_after(value):
+    """Converte o cabeçalho Retry-After (segundos ou data HTTP) em segundos"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+def rate_limited_get(session, url, **kwargs):
+    """GET respeitando o limitador do host; repete enquanto houver 429/503.
+
+    `session` pode ser uma requests.Session ou o próprio módulo requests.
+    Retorna a última resposta obtida, mesmo que ainda seja um 429/503.
+    """
+    limiter = get_limiter(urlparse(url).netloc)
+    response = None
+
+    for _ in range(RATE_LIMIT_MAX_ATTEMPTS):
+        with limiter.slot():
+            try:
+                response = session.get(url, **kwargs)
+            except requests.exceptions.RequestException:
+                limiter.on_error()
+                raise
+
+        if response.status_code in THROTTLE_STATUS:
+            limiter.on_throttle(parse_retry_after(response.headers.get('Retry-After')))
+            continue
+
+        if response.status_code >= 500:
+            limiter.on_error()
+        else:
+            limiter.on_success()
+        return response
+
+    return response
@@ -0,0 +1,73 @@
+import os
+import gzip
+import json
+import hashlib
+import threading
+from datetime import datetime
+from config import ARCHIVE_DIR, ARCHIVE_ENABLED
+
+# Manifesto em JSON Lines: uma entrada por download, a mais recente de cada
+# chave (URL) é a que vale no reprocessamento
+MANIFEST_PATH = os.path.join(ARCHIVE_DIR, 'manifest.jsonl')
+
+_manifest_lock = threading.Lock()
+
+def _object_path(sha256):
+    return os.path.join(ARCHIVE_DIR, 'objects', sha256[:2], sha256 + '.gz')
+
+def archive_response(kind, key, content, meta=None):
+    """Guarda o conteúdo bruto comprimido, endereçado pelo SHA-256.
+
+    Conteúdos idênticos são gravados uma única vez; toda chamada acrescenta
+    uma entrada ao manifesto apontando para o objeto.
+    """
+    if not ARCHIVE_ENABLED:
+        return None
+
+    try:
+        sha256 = hashlib.sha256(content).hexdigest()
+        path = _object_path(sha256)
+
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(gzip.compress(content))
+            os.replace(tmp_path, path)
+
+        entry = {
+            'kind': kind,
+            'key': key,
+            'sha256': sha256,
+            'size': len(content),
+            'fetched_at': datetime.now().isoformat(),
+            'meta': meta or {}
+        }
+        with _manifest_lock:
+            os.makedirs(ARCHIVE_DIR, exist_ok=True)
+            with open(MANIFEST_PATH, 'a') as f:
+                f.write(json.dumps(entry) + '\n')
+        return sha256
+    except Exception as e:
+        print(f"Erro ao arquivar {key}: {e}")
+        return None
+
+def read_manifest(kind=None):
+    """Retorna a entrada mais recente de cada chave, opcionalmente filtrando por tipo"""
+    if not os.path.exists(MANIFEST_PATH):
+        return []
+
+    latest = {}
+    with open(MANIFEST_PATH) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            if kind is None or entry['kind'] == kind:
+                latest[entry['key']] = entry
+    return list(latest.values())
+
+def load_object(sha256):
+    """Lê e descomprime um objeto do arquivo"""
+    with open(_object_path(sha256), 'rb') as f:
+        return gzip.decompress(f.read())
@@ -0,0 +1,11 @@
+import argparse
+from data_processor import reprocess_archive
+
+# Reprocessa o arquivo bruto (raw_archive/) sem acessar as fontes externas
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Reaplica transformação e carga sobre o arquivo bruto")
+    parser.add_argument('--workers', type=int, default=4, help="processos usados na transformação")
+    args = parser.parse_args()
+
+    print("Iniciando reprocessamento do arquivo bruto...")
+    reprocess_archive(workers=args.workers)
@@ -14,8 +14,98 @@ document.addEventListener('DOMContentLoaded', function() {
     if (initDbBtn) {
         initDbBtn.addEventListener('click', initializeDatabase);
     }
+    
+    // Adicionar evento ao botão de exportação do espelho colunar
+    const mirrorBtn = document.getElementById('mirror-bootstrap-btn');
+    if (mirrorBtn) {
+        mirrorBtn.addEventListener('click', bootstrapMirror);
+    }
+    
+    // Adicionar evento ao botão de preenchimento de lacunas
+    const backfillBtn = document.getElementById('backfill-btn');
+    if (backfillBtn) {
+        backfillBtn.addEventListener('click', backfillGaps);
+    }
+
+    const gapsRefreshBtn = document.getElementById('gaps-refresh-btn');
+    if (gapsRefreshBtn) {
+        gapsRefreshBtn.addEventListener('click', refreshGaps);
+    }
 });
 
+function refreshGaps() {
+    // Mostrar indicador de carregamento
+    const gapsRefreshBtn = document.getElementById('gaps-refresh-btn');
+    const originalText = gapsRefreshBtn.innerHTML;
+    gapsRefreshBtn.innerHTML = '<span class="spinner-border spinner-border-sm" role="status"></span> Verificando...';
+    gapsRefreshBtn.disabled = true;
+
+    fetch('/api/gaps/refresh', { method: 'POST' })
+    .then(response => response.json())
+    .then(data => {
+        showAlert(data.message, data.status === 'success' ? 'success' : 'danger');
+    })
+    .catch(error => {
+        console.error('Erro:', error);
+        showAlert('Erro ao verificar lacunas: ' + error.message, 'danger');
+    })
+    .finally(() => {
+        // Restaurar botão
+        gapsRefreshBtn.innerHTML = originalText;
+        gapsRefreshBtn.disabled = false;
+    });
+}
+
+function bootstrapMirror() {
+    if (confirm('Deseja exportar todas as tabelas para o espelho colunar? Esta operação pode demorar vários minutos.')) {
+        // Mostrar indicador de carregamento
+        const mirrorBtn = document.getElementById('mirror-bootstrap-btn');
+        const originalText = mirrorBtn.innerHTML;
+        mirrorBtn.innerHTML = '<span class="spinner-border spinner-border-sm" role="status"></span> Exportando...';
+        mirrorBtn.disabled = true;
+        
+        fetch('/api/mirror/bootstrap', { method: 'POST' })
+        .then(response => response.json())
+        .then(data => {
+            showAlert(data.message, data.status === 'success' ? 'success' : 'danger');
+        })
+        .catch(error => {
+            console.error('Erro:', error);
+            showAlert('Erro ao exportar espelho: ' + error.message, 'danger');
+        })
+        .finally(() => {
+            // Restaurar botão
+            mirrorBtn.innerHTML = originalText;
+            mirrorBtn.disabled = false;
+        });
+    }
+}
+
+function backfillGaps() {
+    if (confirm('Deseja baixar novamente apenas os trechos com lacunas?')) {
+        // Mostrar indicador de carregamento
+        const backfillBtn = document.getElementById('backfill-btn');
+        const originalText = backfillBtn.innerHTML;
+        backfillBtn.innerHTML = '<span class="spinner-border spinner-border-sm" role="status"></span> Preenchendo...';
+        backfillBtn.disabled = true;
+        
+        fetch('/api/backfill', { method: 'POST' })
+        .then(response => response.json())
+        .then(data => {
+            showAlert(data.message, data.status === 'success' ? 'success' : 'danger');
+        })
+        .catch(error => {
+            console.error('Erro:', error);
+            showAlert('Erro ao preencher lacunas: ' + error.message, 'danger');
+        })
+        .finally(() => {
+            // Restaurar botão
+            backfillBtn.innerHTML = originalText;
+            backfillBtn.disabled = false;
+        });
+    }
+}
+
 function updateData() {
     if (confirm('Tem certeza que deseja atualizar os dados? Esta operação pode demorar vários minutos.')) {
         // Mostrar indicador de carregamento
@@ -0,0 +1,189 @@
+import time
+import threading
+from psycopg2 import sql
+from config import CATALOG_TTL, CATALOG_MISS_RELOAD_INTERVAL, ROW_ESTIMATE_MAX_STALE
+from db_connection import get_db_connection
+
+# Nomes reconhecidos como coluna de data (filtros e ordenação)
+DATE_COLUMN_NAMES = ['date', 'data', 'timestamp', 'datetime']
+
+_catalog = None
+_loaded_at = 0.0
+_catalog_lock = threading.Lock()
+
+def _load_catalog():
+    """Lê colunas, tipos, chave única e estimativa de linhas de todas as tabelas públicas"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+
+    cursor.execute("""
+        SELECT c.table_name, c.column_name, c.data_type
+        FROM information_schema.columns c
+        JOIN information_schema.tables t
+          ON t.table_schema = c.table_schema AND t.table_name = c.table_name
+        WHERE c.table_schema = 'public' AND t.table_type = 'BASE TABLE'
+        ORDER BY c.table_name, c.ordinal_position
+    """)
+    catalog = {}
+    for table_name, column_name, data_type in cursor.fetchall():
+        info = catalog.setdefault(table_name, {
+            'columns': [],
+            'types': {},
+            'date_column': None,
+            'key': [],
+            'row_estimate': None
+        })
+        info['columns'].append(column_name)
+        info['types'][column_name] = data_type
+        if info['date_column'] is None and column_name.lower() in DATE_COLUMN_NAMES:
+            info['date_column'] = column_name
+
+    cursor.execute("""
+        SELECT tc.table_name, tc.constraint_name, kcu.column_name
+        FROM information_schema.table_constraints tc
+        JOIN information_schema.key_column_usage kcu
+          ON kcu.constraint_schema = tc.constraint_schema
+         AND kcu.constraint_name = tc.constraint_name
+        WHERE tc.table_schema = 'public'
+          AND tc.constraint_type IN ('PRIMARY KEY', 'UNIQUE')
+        ORDER BY tc.table_name, tc.constraint_type, tc.constraint_name, kcu.ordinal_position
+    """)
+    key_constraint = {}
+    for table_name, constraint_name, column_name in cursor.fetchall():
+        if table_name not in catalog:
+            continue
+        # Usa a primeira restrição encontrada como chave da tabela
+        if key_constraint.setdefault(table_name, constraint_name) == constraint_name:
+            catalog[table_name]['key'].append(column_name)
+
+    cursor.execute("""
+        SELECT c.relname, c.reltuples::BIGINT, COALESCE(s.n_mod_since_analyze, 0)
+        FROM pg_class c
+        JOIN pg_namespace n ON n.oid = c.relnamespace
+        LEFT JOIN pg_stat_user_tables s ON s.relid = c.oid
+        WHERE n.nspname = 'public' AND c.relkind = 'r'
+    """)
+    for table_name, estimate, modified in cursor.fetchall():
+        if table_name not in catalog:
+            continue
+        # reltuples é -1 (ou 0) enquanto a tabela não foi analisada, e fica
+        # defasado quando muitas linhas mudaram desde o último ANALYZE
+        if estimate > 0 and modified <= estimate * ROW_ESTIMATE_MAX_STALE:
+            catalog[table_name]['row_estimate'] = estimate
+
+    cursor.close()
+    conn.close()
+    return catalog
+
+def get_catalog():
+    """Retorna o catálogo em cache, recarregando após CATALOG_TTL segundos"""
+    global _catalog, _loaded_at
+    with _catalog_lock:
+        if _catalog is None or time.monotonic() - _loaded_at > CATALOG_TTL:
+            _catalog = _load_catalog()
+            _loaded_at = time.monotonic()
+        return _catalog
+
+def invalidate_catalog():
+    """Descarta o catálogo; chamado após mudanças de schema (create_tables)"""
+    global _catalog
+    with _catalog_lock:
+        _catalog = None
+
+def list_tables():
+    return sorted(get_catalog())
+
+def _invalidate_after_miss():
+    """Descarta o catálogo após uma tabela desconhecida, no máximo uma vez por intervalo.
+
+    invalidate_catalog só vale no processo que rodou create_tables; os demais
+    workers enxergam a tabela nova na primeira falta, sem que URLs inválidas
+    forcem uma leitura do schema a cada requisição.
+    """
+    global _catalog
+    with _catalog_lock:
+        if _catalog is None or time.monotonic() - _loaded_at < CATALOG_MISS_RELOAD_INTERVAL:
+            return False
+        _catalog = None
+        return True
+
+def get_table_info(table_name):
+    """Retorna as informações da tabela ou ValueError se ela não existir"""
+    info = get_catalog().get(table_name)
+    if info is None and _invalidate_after_miss():
+        info = get_catalog().get(table_name)
+    if info is None:
+        raise ValueError(f"Tabela desconhecida: {table_name}")
+    return info
+
+def quote_ident(name):
+    """Cita um identificador do PostgreSQL (aspas duplas, dobrando as internas)"""
+    return '"' + name.replace('"', '""') + '"'
+
+def build_select(table_name, columns=None, start_date=None, end_date=None,
+                 submarkets=None, order_by_date=False, limit=None, offset=None,
+                 count=False, order_by=None, paramstyle='format'):
+    """Monta um SELECT validado contra o catálogo.
+
+    Tabela e colunas são conferidas no catálogo e entram como identificadores
+    citados; todos os valores (inclusive LIMIT/OFFSET) vão como parâmetros,
+    de modo que o texto da consulta é estável para o mesmo formato de filtro.
+    `order_by` lista as colunas de ordenação (`order_by_date` ordena pela
+    coluna de data da tabela).
+
+    Com paramstyle='format' (psycopg2) retorna (psycopg2.sql.SQL, parâmetros);
+    com paramstyle='numeric' (asyncpg, $1, $2...) retorna (str, parâmetros).
+    """
+    info = get_table_info(table_name)
+
+    columns = columns or info['columns']
+    order_by = list(order_by or [])
+    if order_by_date and info['date_column'] and info['date_column'] not in order_by:
+        order_by.insert(0, info['date_column'])
+
+    unknown = [col for col in columns + order_by if col not in info['types']]
+    if unknown:
+        raise ValueError(f"Colunas desconhecidas em {table_name}: {', '.join(unknown)}")
+
+    params = []
+
+    if paramstyle == 'numeric':
+        ident = quote_ident
+    else:
+        # '%' literal precisa ser dobrado no estilo do psycopg2
+        ident = lambda name: quote_ident(name).replace('%', '%%')
+
+    def placeholder(value):
+        params.append(value)
+        return f"${len(params)}" if paramstyle == 'numeric' else "%s"
+
+    select = "COUNT(*)" if count else ", ".join(ident(col) for col in columns)
+    query = f"SELECT {select} FROM {ident(table_name)}"
+    conditions = []
+
+    date_column = info['date_column']
+    if date_column:
+        if start_date:
+            conditions.append(f"{ident(date_column)} >= {placeholder(start_date)}")
+        if end_date:
+            conditions.append(f"{ident(date_column)} <= {placeholder(end_date)}")
+
+    if submarkets:
+        if 'submarket' not in info['types']:
+            raise ValueError(f"Tabela {table_name} não possui coluna submarket")
+        conditions.append(f"submarket = ANY({placeholder(list(submarkets))})")
+
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+
+    if order_by and not count:
+        query += " ORDER BY " + ", ".join(ident(col) for col in order_by)
+
+    if limit is not None:
+        query += f" LIMIT {placeholder(limit)}"
+    if offset:
+        query += f" OFFSET {placeholder(offset)}"
+
+    if paramstyle == 'numeric':
+        return query, params
+    return sql.SQL(query), params